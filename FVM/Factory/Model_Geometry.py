@@ -126,11 +126,15 @@ class ModelManager:
         return self._shapes.geometry.iloc[union_idx].bounds
 
     
-    def showMesh(self):
+    def showMesh(self, labels=False, max_labels=2000, path=None):
         """
         Show the mesh using matplotlib
+
+        :param labels       :   Label cells with their ID
+        :param max_labels   :   Upper bound on the number of labels
+        :param path         :   Save the figure to this file instead of showing it
         """
-        self._mesh.show()
+        self._mesh.show(labels=labels, max_labels=max_labels, path=path)
 
 
     def getNodes(self):
@@ -141,6 +145,52 @@ class ModelManager:
         return self._mesh.getElements()
 
 
+    def getMesh(self):
+        """
+        Array representation of the generated mesh (cached until the next
+        generate / refine)
+        """
+        return self._mesh.getMesh()
+
+
+    def getFVMesh(self):
+        """
+        Finite volume view of the generated mesh (cached until the next
+        generate / refine)
+        """
+        return self._mesh.getFVMesh()
+
+
+    def partitionMesh(self, n_parts, method="bisection", layers=1):
+        """
+        Split the generated mesh into n_parts parts with halo layers, see
+        FVM.MeshStructure.partition
+        """
+        return self._mesh.partition(n_parts, method=method, layers=layers)
+
+
+    def setMeshReordering(self, method=None):
+        """
+        Renumber cells and nodes of the extracted mesh ("rcm", "morton",
+        "hilbert" or None)
+        """
+        self._mesh.setReordering(method)
+
+
+    def addBoundaryGroup(self, name, curves=None, box=None):
+        """
+        Name boundary curves (by tag or inside a box) for boundary conditions
+        """
+        return self._mesh.addBoundaryGroup(name, curves=curves, box=box)
+
+
+    def getBoundaryGroups(self):
+        """
+        Faces of the finite volume mesh on every named boundary group
+        """
+        return self._mesh.getBoundaryGroups()
+
+
     def generateMesh(self):
         self._mesh.generate()
 
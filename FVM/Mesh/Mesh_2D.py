@@ -1,7 +1,13 @@
 import gmsh
 import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
 from FVM.Mesh import Mesh_Base
+from FVM.MeshStructure.array_mesh import ArrayMesh
+from FVM.MeshStructure.fv_mesh import FVMesh
+from FVM.MeshStructure.partition import partition_mesh
+from FVM.MeshStructure.reorder import METHODS, reorder_mesh
 
 
 class Mesh2D(Mesh_Base.MeshModel):
@@ -25,6 +31,10 @@ class Mesh2D(Mesh_Base.MeshModel):
             self._size = 0
             self._initialized = True
             self._mesh_initialized = False
+            self._array_mesh = None
+            self._fv_mesh = None
+            self.REORDER = None
+            self.reordering = None
 
 
     def __del__(self):
@@ -77,6 +87,8 @@ class Mesh2D(Mesh_Base.MeshModel):
         
         gmsh.model.mesh.refine()    
         gmsh.model.mesh.optimize("Laplace2D")
+        self._array_mesh = None
+        self._fv_mesh = None
 
 
     def generate(self):
@@ -87,6 +99,8 @@ class Mesh2D(Mesh_Base.MeshModel):
         gmsh.option.setNumber("Mesh.Algorithm", 5)
         gmsh.model.mesh.generate(2)
         self._mesh_initialized = True
+        self._array_mesh = None
+        self._fv_mesh = None
 
 
     def getNodes(self):
@@ -97,51 +111,155 @@ class Mesh2D(Mesh_Base.MeshModel):
         return gmsh.model.mesh.getElements()
 
 
-    def show(self):
+    def getMesh(self):
         """
-        Display the generated mesh using Matplotlib.
+        Array representation of the generated mesh. It is built once per
+        generate / refine and cached, so every consumer shares the same arrays.
 
-        :return     :   None
+        :return     :   ArrayMesh
         """
-    
-        # Extract node data
-        node_tags, node_coords, _ = self.getNodes()
-        nodes = node_coords.reshape(-1, 3)[:, :2]  # Extract x and y coordinates
+        if not self._mesh_initialized:
+            raise ValueError("Mesh have not been generated yet.")
 
-        # Extract element data
-        elem_types, elem_tags, elem_node_tags = self.getElements()
+        if self._array_mesh is None:
+            self._array_mesh = ArrayMesh.from_gmsh(*self.getNodes()[:2], *self.getElements())
+            if self.REORDER is not None:
+                # One block per element type keeps show at one PolyCollection per type
+                self._array_mesh, self.reordering = reorder_mesh(self._array_mesh, self.REORDER,
+                                                                 group_types=True)
+        return self._array_mesh
 
-        plt.figure(figsize=(8, 4))
 
-        for elem_type, elem_node_tag in zip(elem_types, elem_node_tags):
-            if elem_type == 2:  # 3-node triangles
-                num_nodes_per_elem = 3
-            elif elem_type == 3:  # 4-node quadrilaterals
-                num_nodes_per_elem = 4
-            else:
-                continue  # Skip unsupported element types
+    def partition(self, n_parts, method="bisection", layers=1):
+        """
+        Split the extracted mesh into parts for multi-process solves.
+
+        :param n_parts  :   Number of parts
+        :param method   :   "bisection" (coordinate) or "graph"
+        :param layers   :   Number of halo cell layers
+        :return         :   (part of every cell, list of Partition)
+        """
+        return partition_mesh(self.getMesh(), n_parts, method=method, layers=layers)
+
+
+    def setReordering(self, method=None):
+        """
+        Renumber the cells and nodes of the extracted mesh for cache locality.
+        The bandwidth report of the last renumbering is kept in reordering.
+
+        :param method   :   "rcm", "morton", "hilbert" or None for the gmsh order
+        :return         :   None
+        """
+        if method is not None and method not in METHODS:
+            raise ValueError(f"Unknown reordering '{method}', expected one of {METHODS}.")
+        if method != self.REORDER:
+            self.REORDER = method
+            self.reordering = None
+            self._array_mesh = None
+            self._fv_mesh = None
+
 
-            elements = np.array(elem_node_tag).reshape(-1, num_nodes_per_elem) - 1  # Zero-based indexing
+    def getFVMesh(self):
+        """
+        Finite volume view of the generated mesh (faces, adjacency, geometry),
+        cached like getMesh.
+
+        :return     :   FVMesh
+        """
+        if self._fv_mesh is None:
+            self._fv_mesh = FVMesh(self.getMesh())
+        return self._fv_mesh
 
-            for i, elem in enumerate(elements):
-                polygon = nodes[elem]
-                polygon = np.vstack([polygon, polygon[0]])  # Close the loop
-                plt.plot(polygon[:, 0], polygon[:, 1], 'k-', linewidth=0.5)
 
-                centroid_x = np.mean(polygon[:-1, 0])  # Exclude the repeated last point
-                centroid_y = np.mean(polygon[:-1, 1])
+    def addBoundaryGroup(self, name, curves=None, box=None):
+        """
+        Name a set of boundary curves as a gmsh physical group, for boundary
+        conditions per group. Call before generate.
+
+        :param name     :   Name of the group
+        :param curves   :   Tags of the curves
+        :param box      :   (x_min, y_min, x_max, y_max), adds every curve inside it
+        :return         :   Tag of the physical group
+        """
+        gmsh.model.occ.synchronize()
+        curves = [] if curves is None else list(curves)
+        if box is not None:
+            x_min, y_min, x_max, y_max = box
+            curves += [tag for _, tag in gmsh.model.getEntitiesInBoundingBox(x_min, y_min, -1, x_max, y_max, 1, dim=1)]
+        if not curves:
+            raise ValueError(f"Boundary group '{name}' has no curves.")
+        return gmsh.model.addPhysicalGroup(1, curves, name=name)
 
-                # Label the cell with its unique ID
-                cell_id = i  # Retrieve the element ID
-                plt.text(centroid_x, centroid_y, str(cell_id), color='red', 
-                         fontsize=8, ha='center', va='center')
 
-        plt.gca().set_aspect('equal')
-        plt.xlabel('X')
-        plt.ylabel('Y')
-        plt.title('Mesh Visualization')
-        plt.grid(False)
-        plt.show()
+    def getBoundaryGroups(self):
+        """
+        Faces of the finite volume mesh on every 1D physical group, matched
+        through the nodes of the group's line elements.
+
+        :return     :   Dict of group name -> (n,) face indices
+        """
+        mesh = self.getMesh()
+        fv_mesh = self.getFVMesh()
+
+        groups = {}
+        for dim, tag in gmsh.model.getPhysicalGroups(1):
+            edges = []
+            for entity in gmsh.model.getEntitiesForPhysicalGroup(dim, tag):
+                for elem_type, _, node_tags in zip(*gmsh.model.mesh.getElements(dim, entity)):
+                    if elem_type == 1:  # 2-node line
+                        edges.append(mesh.node_index(node_tags).reshape(-1, 2))
+            name = gmsh.model.getPhysicalName(dim, tag) or str(tag)
+            edges = np.concatenate(edges) if edges else np.zeros((0, 2), dtype=np.int32)
+            groups[name] = np.unique(fv_mesh.find_faces(edges))
+        return groups
+
+
+    def show(self, labels=False, max_labels=2000, path=None):
+        """
+        Display the generated mesh using Matplotlib. All cells of one element type
+        are drawn as a single PolyCollection.
+
+        :param labels       :   Label cells with their ID
+        :param max_labels   :   Upper bound on the number of labels, larger meshes
+                                only label an evenly strided subset of cells
+        :param path         :   Save the figure to this file instead of showing it,
+                                without going through pyplot (works headless)
+        :return             :   None
+        """
+
+        mesh = self.getMesh()
+
+        if path is None:
+            fig = plt.figure(figsize=(8, 4))
+        else:
+            fig = Figure(figsize=(8, 4))
+        ax = fig.add_subplot()
+
+        centroids = []
+        for _, _, elements in mesh.blocks():
+            polygons = mesh.nodes[elements]
+            ax.add_collection(PolyCollection(polygons, facecolors='none', edgecolors='k', linewidths=0.5))
+            centroids.append(polygons.mean(axis=1))
+
+        if labels and centroids:
+            # Label the cells with their unique ID, at most max_labels of them
+            centroids = np.concatenate(centroids)
+            stride = max(1, int(np.ceil(len(centroids) / max_labels)))
+            for cell_id in range(0, len(centroids), stride):
+                ax.text(centroids[cell_id, 0], centroids[cell_id, 1], str(cell_id), color='red',
+                        fontsize=8, ha='center', va='center')
+
+        ax.autoscale_view()
+        ax.set_aspect('equal')
+        ax.set_xlabel('X')
+        ax.set_ylabel('Y')
+        ax.set_title('Mesh Visualization')
+        ax.grid(False)
+
+        if path is None:
+            plt.show()
+        else:
+            fig.savefig(path)
 
     # ----------------------------- Geometry Methods -------------------------------------------------
 
@@ -0,0 +1,140 @@
+import numpy as np
+
+# gmsh element type -> number of nodes, for the 2D cells the solvers support
+CELL_TYPES = {2: 3,     # 3-node triangle
+              3: 4}     # 4-node quadrilateral
+
+
+def _read_only(arr, dtype):
+    arr = np.ascontiguousarray(arr, dtype=dtype)
+    arr.flags.writeable = False
+    return arr
+
+
+def _lookup_table(tags):
+    """Dense tag -> index table, -1 for tags that are not present."""
+    table = np.full(int(tags.max()) + 1 if len(tags) else 0, -1, dtype=np.int32)
+    table[tags] = np.arange(len(tags), dtype=np.int32)
+    table.flags.writeable = False
+    return table
+
+
+def _lookup(table, tags, what):
+    tags = np.asarray(tags, dtype=np.int64)
+    valid = (tags >= 0) & (tags < len(table))
+    idx = np.full(tags.shape, -1, dtype=np.int32)
+    idx[valid] = table[tags[valid]]
+    if np.any(idx < 0):
+        raise KeyError(f"Unknown {what} tag(s): {np.unique(tags[idx < 0])[:10]}")
+    return idx
+
+
+class ArrayMesh:
+    """
+    Immutable NumPy representation of a 2D mesh.
+
+    Nodes are float64 (x, y) rows. Cells are stored CSR style: the nodes of
+    cell i are cell_nodes[cell_offsets[i]:cell_offsets[i + 1]], given as node
+    indices (not gmsh tags). Cells of one element type are contiguous and
+    listed in cell_blocks. All arrays are read-only, so consumers share them
+    without copying.
+    """
+
+    def __init__(self, nodes, node_tags, cell_offsets, cell_nodes, cell_types, cell_tags):
+        """
+        :param nodes        :   (n_nodes, 2) node coordinates
+        :param node_tags    :   (n_nodes,) gmsh node tags
+        :param cell_offsets :   (n_cells + 1,) CSR offsets into cell_nodes
+        :param cell_nodes   :   Node indices of all cells, concatenated
+        :param cell_types   :   (n_cells,) gmsh element type of each cell
+        :param cell_tags    :   (n_cells,) gmsh element tags
+        """
+        self.nodes = _read_only(nodes, np.float64)
+        self.node_tags = _read_only(node_tags, np.int64)
+        self.cell_offsets = _read_only(cell_offsets, np.int32)
+        self.cell_nodes = _read_only(cell_nodes, np.int32)
+        self.cell_types = _read_only(cell_types, np.int8)
+        self.cell_tags = _read_only(cell_tags, np.int64)
+
+        self._node_table = _lookup_table(self.node_tags)
+        self._cell_table = _lookup_table(self.cell_tags)
+
+        # (element type, first cell, end cell, nodes per cell) of every contiguous block
+        blocks = []
+        change = np.flatnonzero(np.diff(self.cell_types)) + 1
+        for start, stop in zip(np.r_[0, change], np.r_[change, self.n_cells]):
+            if stop > start:
+                elem_type = int(self.cell_types[start])
+                blocks.append((elem_type, int(start), int(stop), CELL_TYPES[elem_type]))
+        self.cell_blocks = tuple(blocks)
+
+    @classmethod
+    def from_gmsh(cls, node_tags, node_coords, elem_types, elem_tags, elem_node_tags):
+        """
+        Build the mesh from the raw output of gmsh.model.mesh.getNodes and
+        gmsh.model.mesh.getElements. Element types other than linear triangles
+        and quadrilaterals are skipped.
+
+        :return     :   ArrayMesh
+        """
+        node_tags = np.asarray(node_tags, dtype=np.int64)
+        nodes = np.asarray(node_coords, dtype=np.float64).reshape(-1, 3)[:, :2]
+        node_table = _lookup_table(node_tags)
+
+        types, tags, conn, counts = [], [], [], []
+        for elem_type, elem_tag, elem_node_tag in zip(elem_types, elem_tags, elem_node_tags):
+            if elem_type not in CELL_TYPES:
+                continue
+            elem_tag = np.asarray(elem_tag, dtype=np.int64)
+            types.append(np.full(len(elem_tag), elem_type, dtype=np.int8))
+            tags.append(elem_tag)
+            conn.append(_lookup(node_table, elem_node_tag, "node"))
+            counts.append(np.full(len(elem_tag), CELL_TYPES[elem_type], dtype=np.int32))
+
+        def concat(arrays, dtype):
+            return np.concatenate(arrays) if arrays else np.zeros(0, dtype=dtype)
+
+        counts = concat(counts, np.int32)
+        offsets = np.zeros(len(counts) + 1, dtype=np.int32)
+        np.cumsum(counts, out=offsets[1:])
+
+        return cls(nodes, node_tags, offsets, concat(conn, np.int32),
+                   concat(types, np.int8), concat(tags, np.int64))
+
+    @property
+    def n_nodes(self):
+        return len(self.nodes)
+
+    @property
+    def n_cells(self):
+        return len(self.cell_offsets) - 1
+
+    @property
+    def nodes_per_cell(self):
+        return np.diff(self.cell_offsets)
+
+    def cell(self, idx):
+        """Node indices of a single cell."""
+        return self.cell_nodes[self.cell_offsets[idx]:self.cell_offsets[idx + 1]]
+
+    def blocks(self):
+        """
+        Iterate over the element type blocks.
+
+        :return     :   (elem_type, first cell index, (M, k) connectivity view)
+        """
+        for elem_type, start, stop, k in self.cell_blocks:
+            conn = self.cell_nodes[self.cell_offsets[start]:self.cell_offsets[stop]]
+            yield elem_type, start, conn.reshape(-1, k)
+
+    def node_index(self, tags):
+        """Map gmsh node tags to node indices, vectorized."""
+        return _lookup(self._node_table, tags, "node")
+
+    def cell_index(self, tags):
+        """Map gmsh element tags to cell indices, vectorized."""
+        return _lookup(self._cell_table, tags, "element")
+
+    def __repr__(self):
+        counts = ", ".join(f"type {t}: {stop - start}" for t, start, stop, _ in self.cell_blocks)
+        return f"ArrayMesh({self.n_nodes} nodes, {self.n_cells} cells [{counts}])"
@@ -0,0 +1,109 @@
+import numpy as np
+
+
+class FaceConnectivity:
+    """
+    Face (edge) connectivity of a 2D mesh for finite volume assembly.
+
+    face_nodes[f] are the two nodes of face f in the order they appear in its
+    owner cell, face_owner[f] is the owner cell and face_neighbour[f] the cell
+    on the other side, or -1 on the boundary. The faces of cell i are
+    cell_faces[cell_offsets[i]:cell_offsets[i + 1]], where local face j joins
+    local nodes j and j + 1 of the cell. The neighbouring cells of cell i are
+    adjacency[adjacency_offsets[i]:adjacency_offsets[i + 1]].
+    """
+
+    def __init__(self, face_nodes, face_owner, face_neighbour, cell_offsets, cell_faces,
+                 adjacency_offsets, adjacency):
+        self.face_nodes = face_nodes
+        self.face_owner = face_owner
+        self.face_neighbour = face_neighbour
+        self.cell_offsets = cell_offsets
+        self.cell_faces = cell_faces
+        self.adjacency_offsets = adjacency_offsets
+        self.adjacency = adjacency
+
+        self.boundary_faces = np.flatnonzero(face_neighbour < 0).astype(np.int32)
+        self.interior_faces = np.flatnonzero(face_neighbour >= 0).astype(np.int32)
+
+    @property
+    def n_faces(self):
+        return len(self.face_owner)
+
+    @property
+    def n_cells(self):
+        return len(self.cell_offsets) - 1
+
+    def neighbours(self, cell):
+        """Indices of the cells sharing a face with cell."""
+        return self.adjacency[self.adjacency_offsets[cell]:self.adjacency_offsets[cell + 1]]
+
+    def faces(self, cell):
+        """Indices of the faces of cell."""
+        return self.cell_faces[self.cell_offsets[cell]:self.cell_offsets[cell + 1]]
+
+
+def half_edges(cell_offsets, cell_nodes):
+    """
+    Every directed cell edge, one per entry of cell_nodes.
+
+    :return     :   (cells, start nodes, end nodes) of the half edges
+    """
+    n_cells = len(cell_offsets) - 1
+    counts = np.diff(cell_offsets)
+    cells = np.repeat(np.arange(n_cells, dtype=np.int32), counts)
+
+    nxt = np.arange(1, len(cell_nodes) + 1)
+    last = cell_offsets[1:] - 1
+    nxt[last] = cell_offsets[:-1]
+    return cells, cell_nodes, cell_nodes[nxt]
+
+
+def build_faces(mesh):
+    """
+    Derive the unique faces, face -> (owner, neighbour) cells, boundary faces and
+    cell -> cell adjacency from the cell-node connectivity in one sort / unique
+    pass over the undirected edge keys.
+
+    :param mesh     :   Mesh with cell_offsets / cell_nodes CSR arrays and n_nodes
+    :return         :   FaceConnectivity
+    """
+    cell_offsets = np.asarray(mesh.cell_offsets)
+    cells, start, end = half_edges(cell_offsets, np.asarray(mesh.cell_nodes))
+    n_cells = len(cell_offsets) - 1
+
+    lo = np.minimum(start, end).astype(np.int64)
+    hi = np.maximum(start, end).astype(np.int64)
+    keys = lo * mesh.n_nodes + hi
+
+    # Faces numbered in key order, order groups the half edges of each face
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    first = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+    starts = np.flatnonzero(first)
+    counts = np.diff(np.r_[starts, len(keys)])
+    if np.any(counts > 2):
+        raise ValueError("Non-manifold mesh: an edge is shared by more than two cells.")
+
+    face_of_half = np.empty(len(keys), dtype=np.int32)
+    face_of_half[order] = np.cumsum(first) - 1
+
+    owner_half = order[starts]
+    face_owner = cells[owner_half]
+    face_nodes = np.column_stack([start[owner_half], end[owner_half]]).astype(np.int32)
+
+    face_neighbour = np.full(len(starts), -1, dtype=np.int32)
+    shared = counts == 2
+    face_neighbour[shared] = cells[order[starts[shared] + 1]]
+
+    # Cell -> cell adjacency, both directions of every interior face
+    owner, neighbour = face_owner[shared], face_neighbour[shared]
+    rows = np.concatenate([owner, neighbour])
+    cols = np.concatenate([neighbour, owner])
+    by_row = np.argsort(rows, kind="stable")
+    adjacency_offsets = np.zeros(n_cells + 1, dtype=np.int32)
+    np.cumsum(np.bincount(rows, minlength=n_cells), out=adjacency_offsets[1:])
+
+    return FaceConnectivity(face_nodes, face_owner.astype(np.int32), face_neighbour,
+                            cell_offsets.astype(np.int32), face_of_half,
+                            adjacency_offsets, cols[by_row].astype(np.int32))
@@ -0,0 +1,173 @@
+import numpy as np
+
+from FVM.MeshStructure.connectivity import build_faces
+from FVM.MeshStructure.geometry import MeshGeometry
+from FVM.MeshStructure.mesh_representation import adjacency_matrix
+
+
+def _csr_transpose(offsets, indices, n_cols):
+    """Transpose of a CSR incidence without values, e.g. cell -> node into node -> cell."""
+    rows = np.repeat(np.arange(len(offsets) - 1, dtype=np.int32), np.diff(offsets))
+    order = np.argsort(indices, kind="stable")
+    t_offsets = np.zeros(n_cols + 1, dtype=np.int32)
+    np.cumsum(np.bincount(indices, minlength=n_cols), out=t_offsets[1:])
+    return t_offsets, rows[order]
+
+
+class FVMesh:
+    """
+    Struct-of-arrays finite volume mesh.
+
+    Every per-entity quantity is one contiguous array indexed by the entity id:
+
+        vertices    coords (n_vertices, 2)
+        cells       centroids (n_cells, 2), volumes (n_cells,)
+        faces       face_nodes (n_faces, 2), face_owner / face_neighbour (n_faces,),
+                    face_midpoints (n_faces, 2), face_areas (n_faces,) edge lengths,
+                    face_normals (n_faces, 2) unit normals pointing out of the owner
+
+    The geometric quantities come from the geometry kernel on first use and are
+    cached until invalidate_geometry (Mesh2D drops the whole mesh on refine).
+
+    Incidences are CSR (offsets, indices) pairs: cell -> node, cell -> face,
+    cell -> cell and node -> cell. get_neighbors and get_boundary_edges keep the
+    VertexBasedMesh interface.
+    """
+
+    def __init__(self, mesh, faces=None):
+        """
+        :param mesh     :   ArrayMesh (or anything with nodes, cell_offsets, cell_nodes)
+        :param faces    :   FaceConnectivity of the mesh, built when not given
+        """
+        faces = build_faces(mesh) if faces is None else faces
+
+        self.coords = mesh.nodes
+        self.cell_offsets = mesh.cell_offsets
+        self.cell_nodes = mesh.cell_nodes
+
+        self.face_nodes = faces.face_nodes
+        self.face_owner = faces.face_owner
+        self.face_neighbour = faces.face_neighbour
+        self.boundary_faces = faces.boundary_faces
+        self.interior_faces = faces.interior_faces
+        self.cell_faces = faces.cell_faces
+        self.adjacency_offsets = faces.adjacency_offsets
+        self.adjacency = faces.adjacency
+        self.node_cell_offsets, self.node_cells = _csr_transpose(
+            self.cell_offsets, self.cell_nodes, len(self.coords))
+
+        self._geometry = None
+        self._matrices = {}
+
+    @property
+    def geometry(self):
+        """Geometric quantities, computed in one vectorized pass on first use and cached."""
+        if self._geometry is None:
+            self._geometry = MeshGeometry(self.coords, self.cell_offsets, self.cell_nodes,
+                                          self.face_nodes, self.face_owner)
+        return self._geometry
+
+    def invalidate_geometry(self):
+        """Drop the cached geometry, e.g. after the node coordinates changed."""
+        self._geometry = None
+
+    @property
+    def centroids(self):
+        return self.geometry.centroids
+
+    @property
+    def volumes(self):
+        return self.geometry.volumes
+
+    @property
+    def face_midpoints(self):
+        return self.geometry.face_midpoints
+
+    @property
+    def face_normals(self):
+        return self.geometry.face_normals
+
+    @property
+    def face_areas(self):
+        return self.geometry.face_areas
+
+    @property
+    def n_vertices(self):
+        return len(self.coords)
+
+    @property
+    def n_cells(self):
+        return len(self.cell_offsets) - 1
+
+    @property
+    def n_faces(self):
+        return len(self.face_owner)
+
+    # Access cell neighbors
+    def get_neighbors(self, c_id):
+        return set(self.adjacency[self.adjacency_offsets[c_id]:self.adjacency_offsets[c_id + 1]].tolist())
+
+    # Access boundary edges
+    def get_boundary_edges(self):
+        return self.boundary_faces.tolist()
+
+    def get_cell_vertices(self, c_id):
+        return self.cell_nodes[self.cell_offsets[c_id]:self.cell_offsets[c_id + 1]]
+
+    def get_cell_edges(self, c_id):
+        return self.cell_faces[self.cell_offsets[c_id]:self.cell_offsets[c_id + 1]]
+
+    def get_vertex_cells(self, v_id):
+        return self.node_cells[self.node_cell_offsets[v_id]:self.node_cell_offsets[v_id + 1]]
+
+    # Sparse adjacency matrices, each built with one COO construction and cached
+
+    def get_vertex_adjacency_matrix(self):
+        """(n_vertices, n_vertices) vertex - vertex adjacency through the faces."""
+        if "vertex" not in self._matrices:
+            self._matrices["vertex"] = adjacency_matrix(self.face_nodes, self.n_vertices)
+        return self._matrices["vertex"]
+
+    def get_cell_adjacency_matrix(self):
+        """(n_cells, n_cells) cell - cell adjacency through the interior faces."""
+        if "cell" not in self._matrices:
+            pairs = np.column_stack([self.face_owner[self.interior_faces],
+                                     self.face_neighbour[self.interior_faces]])
+            self._matrices["cell"] = adjacency_matrix(pairs, self.n_cells)
+        return self._matrices["cell"]
+
+    def get_cell_face_matrix(self):
+        """(n_cells, n_faces) cell - face incidence."""
+        if "cell_face" not in self._matrices:
+            cells = np.repeat(np.arange(self.n_cells), np.diff(self.cell_offsets))
+            pairs = np.column_stack([cells, self.cell_faces])
+            self._matrices["cell_face"] = adjacency_matrix(pairs, self.n_cells, self.n_faces,
+                                                           symmetric=False)
+        return self._matrices["cell_face"]
+
+    def nbytes(self):
+        """Memory held by the mesh arrays, in bytes."""
+        arrays = [value for value in vars(self).values() if isinstance(value, np.ndarray)]
+        if self._geometry is not None:
+            arrays += [value for value in vars(self._geometry).values() if isinstance(value, np.ndarray)]
+        return sum(value.nbytes for value in arrays)
+
+    def find_faces(self, edges):
+        """
+        Faces of the given edges, e.g. the line elements of a gmsh physical
+        group. The faces are numbered in the order of their sorted node pair
+        key, so this is one binary search.
+
+        :param edges    :   (m, 2) node indices, in either orientation
+        :return         :   (m,) face indices
+        """
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        n = self.n_vertices
+        face_keys = self.face_nodes.min(axis=1).astype(np.int64) * n + self.face_nodes.max(axis=1)
+        keys = edges.min(axis=1) * n + edges.max(axis=1)
+
+        faces = np.minimum(np.searchsorted(face_keys, keys), max(self.n_faces - 1, 0))
+        missing = face_keys[faces] != keys if self.n_faces else np.ones(len(keys), dtype=bool)
+        if np.any(missing):
+            raise KeyError(f"Edge(s) that are not mesh faces: {edges[missing][:10].tolist()}")
+        return faces.astype(np.int32)
@@ -1,5 +1,30 @@
 import numpy as np
-from scipy.sparse import csr_matrix
+from scipy.sparse import coo_matrix
+
+from FVM.MeshStructure.geometry import cell_geometry
+
+def adjacency_matrix(pairs, n_rows, n_cols=None, symmetric=True):
+    """
+    Sparse 0/1 adjacency matrix from an (m, 2) array of index pairs, built with a
+    single COO -> CSR conversion. Duplicate pairs collapse to one entry.
+
+    :param pairs        :   (m, 2) row / column indices
+    :param n_rows       :   Number of rows
+    :param n_cols       :   Number of columns, n_rows when not given
+    :param symmetric    :   Also add the transposed pairs
+    :return             :   CSR matrix with int8 entries
+    """
+    n_cols = n_rows if n_cols is None else n_cols
+    rows, cols = pairs[:, 0], pairs[:, 1]
+    if symmetric:
+        rows, cols = np.concatenate([rows, cols]), np.concatenate([cols, rows])
+
+    adjacency = coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)),
+                           shape=(n_rows, n_cols)).tocsr()
+    adjacency.sum_duplicates()
+    adjacency.data[:] = 1
+    return adjacency
+
 
 class VertexBasedMesh:
     def __init__(self):
@@ -7,6 +32,7 @@ class VertexBasedMesh:
         self.edges      = {}        # Edge data
         self.cells      = {}        # Cell data
         self.neighbors  = {}        # Neighbor relationships
+        self._adjacency = None      # Cached vertex adjacency matrix
 
     # Add a vertex
     def add_vertex(self, v_id, coords):
@@ -22,6 +48,7 @@ class VertexBasedMesh:
             "vertices": (v1, v2),
             "cells": set()
         }
+        self._adjacency = None
         # Update vertex connectivity
         self.vertices[v1]["edges"].add(e_id)
         self.vertices[v2]["edges"].add(e_id)
@@ -30,8 +57,10 @@ class VertexBasedMesh:
     def add_cell(self, c_id, vertex_ids, edge_ids):
         # Calculate centroid and volume
         coords = np.array([self.vertices[v_id]["coords"] for v_id in vertex_ids])
-        centroid = coords.mean(axis=0)
-        volume = 0.5 * abs(np.cross(coords[1] - coords[0], coords[2] - coords[0]))  # For 2D triangle
+        signed_area, centroid = cell_geometry(coords, np.array([0, len(vertex_ids)]),
+                                              np.arange(len(vertex_ids)))  # Triangles and quads
+        centroid = centroid[0]
+        volume = abs(signed_area[0])
         
         self.cells[c_id] = {
             "vertices": vertex_ids,
@@ -81,22 +110,28 @@ class VertexBasedMesh:
 
     # Get sparse adjacency matrix for vertices
     def get_vertex_adjacency_matrix(self):
-        num_vertices = len(self.vertices)
-        adjacency = csr_matrix((num_vertices, num_vertices), dtype=int)
-        for e_id, edge_data in self.edges.items():
-            v1, v2 = edge_data["vertices"]
-            adjacency[v1, v2] = 1
-            adjacency[v2, v1] = 1
-        return adjacency
+        if self._adjacency is None:
+            edges = np.array([edge_data["vertices"] for edge_data in self.edges.values()],
+                             dtype=np.int64).reshape(-1, 2)
+            self._adjacency = adjacency_matrix(edges, len(self.vertices))
+        return self._adjacency
 
     # Flux computation skeleton
     def compute_fluxes(self):
-        # Example placeholder for flux calculations
-        fluxes = {}
-        for c_id, cell_data in self.cells.items():
-            centroid = cell_data["centroid"]
-            for neighbor_id in self.neighbors[c_id]:
-                neighbor_centroid = self.cells[neighbor_id]["centroid"]
-                # Flux computation logic here
-                fluxes[(c_id, neighbor_id)] = np.linalg.norm(neighbor_centroid - centroid)
-        return fluxes
+        """
+        Centroid distance across every cell pair, once per shared face. The
+        per-cell state flux evaluation lives in FVM.Solver.flux.FluxEngine.
+
+        :return     :   ((m, 2) cell id pairs, (m,) distances)
+        """
+        pairs = np.array([(c_id, n_id) for c_id, neighbors in self.neighbors.items()
+                          for n_id in neighbors], dtype=np.int64).reshape(-1, 2)
+        pairs = np.unique(np.sort(pairs, axis=1), axis=0)
+        if not len(pairs):
+            return pairs, np.zeros(0)
+
+        ids = np.array(list(self.cells))
+        centroids = np.array([cell["centroid"] for cell in self.cells.values()])
+        index = np.argsort(ids)
+        rows = index[np.searchsorted(ids[index], pairs)]
+        return pairs, np.linalg.norm(centroids[rows[:, 1]] - centroids[rows[:, 0]], axis=1)
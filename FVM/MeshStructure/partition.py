@@ -0,0 +1,193 @@
+import numpy as np
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+
+from FVM.MeshStructure.array_mesh import ArrayMesh
+from FVM.MeshStructure.connectivity import build_faces
+from FVM.MeshStructure.mesh_representation import adjacency_matrix
+
+"""
+Mesh partitioning for multi-process finite volume solves.
+
+The cells are split into K parts, either by recursive coordinate bisection of
+the cell centroids or along the level sets of a Reverse Cuthill-McKee ordering
+of the cell graph. Every part gets a local mesh holding its own cells first
+and then `layers` rings of ghost (halo) cells, plus the send / receive index
+lists of the halo exchange with each neighbouring part.
+"""
+
+METHODS = ("bisection", "graph")
+
+
+def coordinate_bisection(points, n_parts):
+    """
+    Recursive coordinate bisection: split along the longest extent at the
+    point that balances the cell count, until there are n_parts parts.
+
+    :param points   :   (n, 2) cell centroids
+    :param n_parts  :   Number of parts
+    :return         :   (n,) part of every cell
+    """
+    parts = np.zeros(len(points), dtype=np.int32)
+    stack = [(np.arange(len(points)), 0, n_parts)]
+    while stack:
+        idx, first, k = stack.pop()
+        if k == 1:
+            parts[idx] = first
+            continue
+        k_lo = k // 2
+        extent = points[idx].max(axis=0) - points[idx].min(axis=0)
+        order = idx[np.argsort(points[idx, np.argmax(extent)], kind="stable")]
+        cut = len(idx) * k_lo // k
+        stack += [(order[:cut], first, k_lo), (order[cut:], first + k_lo, k - k_lo)]
+    return parts
+
+
+def graph_parts(adjacency, n_parts):
+    """
+    Contiguous chunks of a Reverse Cuthill-McKee ordering. The ordering sweeps
+    the cell graph in level sets, so every chunk is a compact band of cells.
+
+    :param adjacency    :   (n, n) cell adjacency matrix
+    :param n_parts      :   Number of parts
+    :return             :   (n,) part of every cell
+    """
+    n = adjacency.shape[0]
+    parts = np.empty(n, dtype=np.int32)
+    parts[reverse_cuthill_mckee(adjacency, symmetric_mode=True)] = np.arange(n, dtype=np.int64) * n_parts // n
+    return parts
+
+
+def extract_cells(mesh, cells):
+    """
+    Submesh made of the given cells, in that order, with its nodes kept in
+    their global order.
+
+    :param mesh     :   ArrayMesh
+    :param cells    :   Cell indices
+    :return         :   (ArrayMesh, global node index of every local node)
+    """
+    counts = mesh.nodes_per_cell[cells]
+    offsets = np.zeros(len(cells) + 1, dtype=np.int32)
+    np.cumsum(counts, out=offsets[1:])
+
+    starts = np.repeat(mesh.cell_offsets[cells], counts)
+    local = np.arange(offsets[-1]) - np.repeat(offsets[:-1], counts)
+    global_nodes, cell_nodes = np.unique(mesh.cell_nodes[starts + local], return_inverse=True)
+
+    submesh = ArrayMesh(mesh.nodes[global_nodes], mesh.node_tags[global_nodes], offsets, cell_nodes,
+                        mesh.cell_types[cells], mesh.cell_tags[cells])
+    return submesh, global_nodes
+
+
+class Partition:
+    """
+    One part of a partitioned mesh.
+
+    The local cells are the owned cells followed by the halo cells, and
+    cells[i] is the global index of local cell i. send[q] are the local indices
+    of the owned cells that part q holds as halo, recv[q] the local indices of
+    the halo cells owned by part q; send_global / recv_global are the same
+    cells in the global numbering.
+    """
+
+    def __init__(self, rank, owned, halo, mesh, nodes, send, recv):
+        self.rank = rank
+        self.cells = np.concatenate([owned, halo]).astype(np.int32)
+        self.nodes = nodes
+        self.mesh = mesh
+        self.n_owned = len(owned)
+        self.send = send
+        self.recv = recv
+        self.send_global = {q: self.cells[idx] for q, idx in send.items()}
+        self.recv_global = {q: self.cells[idx] for q, idx in recv.items()}
+
+    @property
+    def owned(self):
+        return self.cells[:self.n_owned]
+
+    @property
+    def halo(self):
+        return self.cells[self.n_owned:]
+
+    @property
+    def n_local(self):
+        return len(self.cells)
+
+    @property
+    def neighbours(self):
+        return sorted(self.recv)
+
+    def __repr__(self):
+        return (f"Partition({self.rank}: {self.n_owned} owned, {self.n_local - self.n_owned} halo cells, "
+                f"neighbours {self.neighbours})")
+
+
+def _halo(adjacency, owned, layers):
+    """Rings of cells around owned, nearest ring first."""
+    inside = np.zeros(adjacency.shape[0], dtype=bool)
+    inside[owned] = True
+    front, rings = owned, []
+    for _ in range(layers):
+        touched = np.unique(adjacency[front].indices)
+        front = touched[~inside[touched]]
+        inside[front] = True
+        rings.append(front)
+    return np.concatenate(rings) if rings else np.zeros(0, dtype=np.int32)
+
+
+def partition_mesh(mesh, n_parts, method="bisection", layers=1, parts=None):
+    """
+    Split a mesh into n_parts parts with local numbering, halos and the
+    send / receive lists of the halo exchange.
+
+    :param mesh     :   ArrayMesh
+    :param n_parts  :   Number of parts
+    :param method   :   "bisection" (coordinate) or "graph"
+    :param layers   :   Number of halo cell layers
+    :param parts    :   (n_cells,) precomputed part of every cell, overrides method
+    :return         :   (parts, list of Partition)
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown partitioning '{method}', expected one of {METHODS}.")
+    if not 1 <= n_parts <= mesh.n_cells:
+        raise ValueError(f"Cannot split {mesh.n_cells} cells into {n_parts} parts.")
+
+    faces = build_faces(mesh)
+    interior = faces.interior_faces
+    adjacency = adjacency_matrix(np.column_stack([faces.face_owner[interior],
+                                                  faces.face_neighbour[interior]]), mesh.n_cells)
+
+    if parts is None:
+        if method == "bisection":
+            cells = np.repeat(np.arange(mesh.n_cells), mesh.nodes_per_cell)
+            centroids = np.column_stack([np.bincount(cells, mesh.nodes[mesh.cell_nodes, d], mesh.n_cells)
+                                         for d in range(2)]) / mesh.nodes_per_cell[:, None]
+            parts = coordinate_bisection(centroids, n_parts)
+        else:
+            parts = graph_parts(adjacency, n_parts)
+    parts = np.asarray(parts, dtype=np.int32)
+
+    owned = [np.flatnonzero(parts == p).astype(np.int32) for p in range(n_parts)]
+    halos = [_halo(adjacency, owned[p], layers) for p in range(n_parts)]
+
+    recv = []
+    for p in range(n_parts):
+        owner = parts[halos[p]]
+        recv.append({int(q): owned[p].size + np.flatnonzero(owner == q).astype(np.int32)
+                     for q in np.unique(owner)})
+
+    # Global -> local index of the owned cells of part p, for its send lists
+    local_index = np.full(mesh.n_cells, -1, dtype=np.int32)
+    partitions = []
+    for p in range(n_parts):
+        local_index[owned[p]] = np.arange(len(owned[p]), dtype=np.int32)
+        send = {}
+        for q in range(n_parts):
+            if p in recv[q]:
+                send[q] = local_index[halos[q][recv[q][p] - owned[q].size]]
+        local_index[owned[p]] = -1
+
+        submesh, nodes = extract_cells(mesh, np.concatenate([owned[p], halos[p]]))
+        partitions.append(Partition(p, owned[p], halos[p], submesh, nodes, send, recv[p]))
+
+    return parts, partitions
@@ -0,0 +1,183 @@
+import numpy as np
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+
+from FVM.MeshStructure.array_mesh import ArrayMesh
+from FVM.MeshStructure.connectivity import build_faces
+from FVM.MeshStructure.mesh_representation import adjacency_matrix
+
+"""
+Cell and node renumbering for cache locality.
+
+gmsh numbers elements in no useful order, so neighbouring cells end up far
+apart in memory and every gather over neighbours misses cache. Renumbering by
+Reverse Cuthill-McKee (RCM) or along a Morton / Hilbert space filling curve
+keeps neighbours close, which shrinks the bandwidth of the assembled matrices
+and speeds up flux loops and sparse solves alike.
+
+On mixed meshes the reordered cells generally alternate between element
+types, so the ArrayMesh has many small blocks; group_types keeps one block per
+type at the cost of the couplings across the type boundary.
+"""
+
+METHODS = ("rcm", "morton", "hilbert")
+
+
+def bandwidth(matrix):
+    """Largest |i - j| over the nonzeros of a sparse matrix."""
+    coo = matrix.tocoo()
+    return int(np.abs(coo.row.astype(np.int64) - coo.col).max()) if coo.nnz else 0
+
+
+def mean_distance(matrix):
+    """Mean |i - j| over the nonzeros, the typical gather stride (curves keep it
+    small even where a few couplings, and so the bandwidth, stay large)."""
+    coo = matrix.tocoo()
+    return float(np.abs(coo.row.astype(np.int64) - coo.col).mean()) if coo.nnz else 0.0
+
+
+def _grid_coordinates(points, bits):
+    """Quantize points onto a 2**bits x 2**bits integer grid."""
+    lo = points.min(axis=0)
+    extent = np.maximum(points.max(axis=0) - lo, np.finfo(float).tiny)
+    return np.minimum(((points - lo) / extent * (1 << bits)).astype(np.int64), (1 << bits) - 1)
+
+
+def morton_keys(points, bits=16):
+    """Z-order curve index of every point, by interleaving the bits of x and y."""
+    ij = _grid_coordinates(points, bits)
+    keys = np.zeros(len(points), dtype=np.int64)
+    for b in range(bits):
+        keys |= ((ij[:, 0] >> b) & 1) << (2 * b)
+        keys |= ((ij[:, 1] >> b) & 1) << (2 * b + 1)
+    return keys
+
+
+def hilbert_keys(points, bits=16):
+    """Hilbert curve index of every point, all points at once, bit by bit."""
+    ij = _grid_coordinates(points, bits)
+    x, y = ij[:, 0].copy(), ij[:, 1].copy()
+    keys = np.zeros(len(points), dtype=np.int64)
+    s = 1 << (bits - 1)
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        keys += s * s * ((3 * rx) ^ ry)
+
+        # Rotate the quadrant so the curve continues in the next level
+        flip = ~ry & rx
+        x[flip] = s - 1 - x[flip]
+        y[flip] = s - 1 - y[flip]
+        swap = ~ry
+        x[swap], y[swap] = y[swap], x[swap]
+        s >>= 1
+    return keys
+
+
+def _order(method, adjacency, points):
+    """New -> old permutation of the entities by the given method."""
+    if method == "rcm":
+        return reverse_cuthill_mckee(adjacency, symmetric_mode=True).astype(np.int32)
+    keys = morton_keys(points) if method == "morton" else hilbert_keys(points)
+    return np.argsort(keys, kind="stable").astype(np.int32)
+
+
+class Reordering:
+    """
+    Result of a renumbering: the new -> old permutations of cells and nodes,
+    their inverses, and the bandwidth and mean index distance of the cell and
+    node adjacency matrices before and after, as {"cells": (bandwidth, mean),
+    "nodes": (bandwidth, mean)}.
+    """
+
+    def __init__(self, method, cells, nodes, bandwidth_before, bandwidth_after):
+        self.method = method
+        self.cells = cells
+        self.nodes = nodes
+        self.cell_inverse = np.argsort(cells).astype(np.int32)
+        self.node_inverse = np.argsort(nodes).astype(np.int32)
+        self.bandwidth_before = bandwidth_before
+        self.bandwidth_after = bandwidth_after
+
+    def permute_cells(self, data):
+        """Cell data in the old numbering -> new numbering (along the first axis)."""
+        return np.asarray(data)[self.cells]
+
+    def permute_nodes(self, data):
+        """Node data in the old numbering -> new numbering (along the first axis)."""
+        return np.asarray(data)[self.nodes]
+
+    def restore_cells(self, data):
+        """Cell data in the new numbering -> old numbering."""
+        return np.asarray(data)[self.cell_inverse]
+
+    def restore_nodes(self, data):
+        """Node data in the new numbering -> old numbering."""
+        return np.asarray(data)[self.node_inverse]
+
+    def report(self):
+        lines = [f"Reordering ({self.method})"]
+        for name in ("cells", "nodes"):
+            (b0, m0), (b1, m1) = self.bandwidth_before[name], self.bandwidth_after[name]
+            lines.append(f"    {name:5s} bandwidth {b0:>10d} -> {b1:>10d}    "
+                         f"mean distance {m0:>12.1f} -> {m1:>10.1f}")
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return self.report()
+
+
+def _adjacencies(mesh):
+    faces = build_faces(mesh)
+    interior = faces.interior_faces
+    cell_pairs = np.column_stack([faces.face_owner[interior], faces.face_neighbour[interior]])
+    return adjacency_matrix(cell_pairs, mesh.n_cells), adjacency_matrix(faces.face_nodes, mesh.n_nodes)
+
+
+def _centroids(mesh):
+    cells = np.repeat(np.arange(mesh.n_cells), mesh.nodes_per_cell)
+    sums = np.column_stack([np.bincount(cells, mesh.nodes[mesh.cell_nodes, d], mesh.n_cells)
+                            for d in range(2)])
+    return sums / mesh.nodes_per_cell[:, None]
+
+
+def reorder_mesh(mesh, method="rcm", group_types=False):
+    """
+    Renumber the cells and nodes of a mesh and permute every array to match.
+
+    :param mesh         :   ArrayMesh
+    :param method       :   "rcm", "morton" or "hilbert"
+    :param group_types  :   Keep the cells of each element type contiguous
+    :return             :   (reordered ArrayMesh, Reordering)
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown reordering '{method}', expected one of {METHODS}.")
+
+    cell_adjacency, node_adjacency = _adjacencies(mesh)
+
+    node_order = _order(method, node_adjacency, mesh.nodes)
+    cell_order = _order(method, cell_adjacency, _centroids(mesh))
+    if group_types:
+        cell_order = cell_order[np.argsort(mesh.cell_types[cell_order], kind="stable")]
+
+    node_inverse = np.argsort(node_order).astype(np.int32)
+    counts = mesh.nodes_per_cell[cell_order]
+    offsets = np.zeros(mesh.n_cells + 1, dtype=np.int32)
+    np.cumsum(counts, out=offsets[1:])
+
+    # Gather the node lists of the cells in their new order, then renumber the nodes
+    starts = np.repeat(mesh.cell_offsets[cell_order], counts)
+    local = np.arange(offsets[-1]) - np.repeat(offsets[:-1], counts)
+    cell_nodes = node_inverse[mesh.cell_nodes[starts + local]]
+
+    reordered = ArrayMesh(mesh.nodes[node_order], mesh.node_tags[node_order], offsets, cell_nodes,
+                          mesh.cell_types[cell_order], mesh.cell_tags[cell_order])
+
+    new_cell_adjacency, new_node_adjacency = _adjacencies(reordered)
+
+    def measure(cells, nodes):
+        return {"cells": (bandwidth(cells), mean_distance(cells)),
+                "nodes": (bandwidth(nodes), mean_distance(nodes))}
+
+    before = measure(cell_adjacency, node_adjacency)
+    after = measure(new_cell_adjacency, new_node_adjacency)
+    return reordered, Reordering(method, cell_order, node_order, before, after)
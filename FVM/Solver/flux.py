@@ -0,0 +1,140 @@
+import numpy as np
+
+"""
+Face based finite volume flux evaluation.
+
+Cell states are gathered to both sides of every face through the owner /
+neighbour index arrays, a numerical flux is evaluated for all faces in one
+vectorized call, and the face fluxes are scattered back into a per-cell
+residual with np.bincount. Boundary faces see a ghost state on the neighbour
+side.
+
+A physics object provides
+    normal_flux(u, n)   ->  F(u) . n for states u (k, m) and unit normals n (k, 2)
+    wave_speeds(u, n)   ->  (s_min, s_max), smallest and largest signal speeds
+"""
+
+
+class LinearAdvection:
+    def __init__(self, velocity):
+        """
+        Scalar (or componentwise) advection, F(u) = u * velocity.
+
+        :param velocity     :   Constant (2,) velocity or (n_faces, 2) face velocities
+        """
+        self.velocity = np.asarray(velocity, dtype=float)
+
+    def normal_speed(self, n):
+        return np.einsum("...j,...j->...", np.broadcast_to(self.velocity, n.shape), n)
+
+    def normal_flux(self, u, n):
+        return u * self.normal_speed(n)[:, None]
+
+    def wave_speeds(self, u, n):
+        a_n = self.normal_speed(n)
+        return a_n, a_n
+
+
+# ----------------------------- Numerical Fluxes ---------------------------------------------------
+
+def upwind(physics, u_L, u_R, n):
+    """Flux of the upwind side, chosen by the sign of the mean signal speed."""
+    s_min, s_max = physics.wave_speeds(0.5 * (u_L + u_R), n)
+    from_left = (0.5 * (s_min + s_max) >= 0)[:, None]
+    return np.where(from_left, physics.normal_flux(u_L, n), physics.normal_flux(u_R, n))
+
+
+def central(physics, u_L, u_R, n):
+    """Average of the two side fluxes (no dissipation)."""
+    return 0.5 * (physics.normal_flux(u_L, n) + physics.normal_flux(u_R, n))
+
+
+def rusanov(physics, u_L, u_R, n):
+    """Local Lax-Friedrichs flux, dissipation scaled by the fastest signal speed."""
+    s_min_L, s_max_L = physics.wave_speeds(u_L, n)
+    s_min_R, s_max_R = physics.wave_speeds(u_R, n)
+    s = np.max(np.abs([s_min_L, s_max_L, s_min_R, s_max_R]), axis=0)[:, None]
+    return central(physics, u_L, u_R, n) - 0.5 * s * (u_R - u_L)
+
+
+def hll(physics, u_L, u_R, n):
+    """Harten-Lax-van Leer flux with the two outermost signal speeds."""
+    s_min_L, s_max_L = physics.wave_speeds(u_L, n)
+    s_min_R, s_max_R = physics.wave_speeds(u_R, n)
+    s_L = np.minimum(np.minimum(s_min_L, s_min_R), 0.0)[:, None]
+    s_R = np.maximum(np.maximum(s_max_L, s_max_R), 0.0)[:, None]
+
+    F_L = physics.normal_flux(u_L, n)
+    F_R = physics.normal_flux(u_R, n)
+    width = np.where(s_R - s_L > 0, s_R - s_L, 1.0)
+    return (s_R * F_L - s_L * F_R + s_L * s_R * (u_R - u_L)) / width
+
+
+FLUXES = {"upwind": upwind, "central": central, "rusanov": rusanov, "hll": hll}
+
+
+class FluxEngine:
+    def __init__(self, mesh, physics, flux="upwind"):
+        """
+        :param mesh     :   FVMesh
+        :param physics  :   Physics object, e.g. LinearAdvection
+        :param flux     :   Name in FLUXES or a callable flux(physics, u_L, u_R, n)
+        """
+        if isinstance(flux, str):
+            if flux not in FLUXES:
+                raise ValueError(f"Unknown flux '{flux}', expected one of {tuple(FLUXES)}.")
+            flux = FLUXES[flux]
+
+        self.mesh = mesh
+        self.physics = physics
+        self.flux = flux
+
+        self.owner = mesh.face_owner
+        self.boundary = mesh.boundary_faces
+        # Boundary faces point at their owner until a ghost state replaces it
+        self.neighbour = np.where(mesh.face_neighbour >= 0, mesh.face_neighbour, mesh.face_owner)
+
+    def face_states(self, u, ghost=None):
+        """
+        States on both sides of every face.
+
+        :param u        :   (n_cells, m) cell states
+        :param ghost    :   (n_boundary, m) states outside the boundary faces, a
+                            callable ghost(u_L, faces) returning them, or None for
+                            zero gradient
+        :return         :   (u_L, u_R), each (n_faces, m)
+        """
+        u_L = u[self.owner]
+        u_R = u[self.neighbour]
+        if ghost is not None:
+            if callable(ghost):
+                ghost = ghost(u_L[self.boundary], self.boundary)
+            u_R[self.boundary] = np.reshape(ghost, (len(self.boundary), -1))
+        return u_L, u_R
+
+    def face_fluxes(self, u, ghost=None):
+        """Integrated numerical flux F . n * |face| of every face, (n_faces, m)."""
+        u_L, u_R = self.face_states(u, ghost)
+        return self.flux(self.physics, u_L, u_R, self.mesh.face_normals) * self.mesh.face_areas[:, None]
+
+    def residual(self, u, ghost=None):
+        """
+        Rate of change du/dt = -(1 / V) sum_faces F . n |face| of every cell.
+
+        :param u        :   (n_cells,) or (n_cells, m) cell states
+        :param ghost    :   Boundary ghost states, see face_states
+        :return         :   Array with the shape of u
+        """
+        scalar = np.ndim(u) == 1
+        u2 = np.asarray(u, dtype=float).reshape(len(u), -1)
+
+        F = self.face_fluxes(u2, ghost)
+        n_cells = self.mesh.n_cells
+        interior = self.mesh.interior_faces
+        R = np.empty((n_cells, u2.shape[1]))
+        for k in range(u2.shape[1]):
+            R[:, k] = np.bincount(self.owner, F[:, k], n_cells) \
+                - np.bincount(self.mesh.face_neighbour[interior], F[interior, k], n_cells)
+        R /= -self.mesh.volumes[:, None]
+
+        return R[:, 0] if scalar else R
@@ -0,0 +1,411 @@
+import numpy as np
+from scipy.sparse import coo_matrix, csr_matrix
+
+from FVM.Solver import krylov
+from FVM.Solver.laplacian import diffusion_operator, factorize_spd
+
+"""
+Incompressible Navier-Stokes on unstructured 2D meshes.
+
+Collocated finite volume projection method. Velocities live in the cells, the
+volume fluxes phi in the faces. Every step
+
+    1. (V / dt + nu K / 2) u_hat = (V / dt - nu K / 2) u - C(u, phi) + nu b
+                                        advection C (upwind or linear upwind)
+                                        explicit with Adams-Bashforth 2,
+                                        diffusion K implicit Crank-Nicolson
+    2. phi*  = interpolated u_hat . n |f|
+    3. L p   = div(phi*) / dt           two point flux pressure Laplacian
+    4. phi   = phi* - dt * (grad p . n)_f |f|    exactly divergence free
+       u     = u_hat - dt * grad p               Green-Gauss cell gradient
+
+Both matrices are factorized once (the velocity matrix again when the time
+step changes), so a step costs three triangular solves and a handful of
+sparse gathers / scatters, and the time step is only limited by the advective
+CFL number. Correcting the face fluxes with the compact face gradient
+(Rhie-Chow style) rather than interpolated cell gradients avoids pressure
+checkerboarding.
+
+On meshes too large to factorize the pressure equation can be solved with a
+preconditioned Krylov method instead (pressure_solver), with the
+preconditioner set up once and every solve warm started from the previous
+pressure.
+
+Boundary faces are grouped by kind:
+
+    inlet       u = inlet velocity, dp/dn = 0
+    outlet      du/dn = 0, p = 0
+    wall        u = 0 (no slip), dp/dn = 0
+    slip        u . n = 0, zero tangential gradient, dp/dn = 0
+
+The implicit diffusion treats slip faces as zero gradient for both
+components; the projection still enforces zero flux through them.
+"""
+
+BOUNDARY_KINDS = ("inlet", "outlet", "wall", "slip")
+ADVECTION = ("upwind", "linear-upwind")
+
+
+def classify_boundaries(mesh, sides=None, tol=1e-6):
+    """
+    Group the boundary faces of a channel-like domain by where they lie: faces on
+    the bounding box edges get the kind given in sides, all others (an obstacle
+    inside the domain) are walls.
+
+    :param mesh     :   FVMesh
+    :param sides    :   Kind of the "left", "right", "bottom" and "top" edges,
+                        defaults to inlet, outlet and two slip walls
+    :param tol      :   Distance from the box edge, relative to its size
+    :return         :   {kind: face indices}
+    """
+    sides = {"left": "inlet", "right": "outlet", "bottom": "slip", "top": "slip", **(sides or {})}
+    faces = mesh.boundary_faces
+    mid = mesh.face_midpoints[faces]
+    lo, hi = mesh.coords.min(axis=0), mesh.coords.max(axis=0)
+    eps = tol * np.max(hi - lo)
+
+    kind = np.full(len(faces), "wall", dtype=object)
+    for side, on_side in (("left", mid[:, 0] < lo[0] + eps), ("right", mid[:, 0] > hi[0] - eps),
+                          ("bottom", mid[:, 1] < lo[1] + eps), ("top", mid[:, 1] > hi[1] - eps)):
+        kind[on_side] = sides[side]
+    return {k: faces[kind == k] for k in BOUNDARY_KINDS if np.any(kind == k)}
+
+
+def strouhal(signal, dt, diameter=1.0, velocity=1.0, skip=0.5):
+    """
+    Strouhal number St = f D / U from the dominant frequency of a probe signal,
+    e.g. the cross-stream velocity behind a cylinder.
+
+    :param signal   :   Samples taken every dt
+    :param dt       :   Sampling interval
+    :param diameter :   Body diameter D
+    :param velocity :   Free stream velocity U
+    :param skip     :   Fraction of the signal discarded as the start-up transient
+    :return         :   Strouhal number
+    """
+    signal = np.asarray(signal, dtype=float)
+    signal = signal[int(skip * len(signal)):]
+    if len(signal) < 4:
+        raise ValueError("Signal too short to find its frequency.")
+    signal = (signal - signal.mean()) * np.hanning(len(signal))
+
+    spectrum = np.abs(np.fft.rfft(signal, n=4 * len(signal)))
+    k = 1 + int(np.argmax(spectrum[1:]))
+    if 0 < k < len(spectrum) - 1:
+        # Parabolic interpolation of the peak between the frequency bins
+        a, b, c = spectrum[k - 1], spectrum[k], spectrum[k + 1]
+        k += 0.5 * (a - c) / (a - 2 * b + c)
+    frequency = k / (4 * len(signal) * dt)
+    return frequency * diameter / velocity
+
+
+class IncompressibleFlow:
+    def __init__(self, mesh, nu, dt, boundaries=None, inlet_velocity=(1.0, 0.0),
+                 advection="linear-upwind", u0=None, pressure_solver="factorized",
+                 preconditioner="amg", pressure_tol=1e-10):
+        """
+        :param mesh             :   FVMesh
+        :param nu               :   Kinematic viscosity
+        :param dt               :   Time step
+        :param boundaries       :   {kind: boundary face indices}, see classify_boundaries
+        :param inlet_velocity   :   Velocity at inlet faces, (2,) or (n_inlet, 2)
+        :param advection        :   "upwind" or "linear-upwind" (second order)
+        :param u0               :   (n_cells, 2) initial velocity, at rest by default
+        :param pressure_solver  :   "factorized", or a Krylov method ("cg", "bicgstab",
+                                    "gmres") for meshes too large to factorize
+        :param preconditioner   :   Preconditioner of the Krylov pressure solve
+        :param pressure_tol     :   Relative residual of the Krylov pressure solve, the
+                                    projected fluxes are divergence free up to it
+        """
+        if advection not in ADVECTION:
+            raise ValueError(f"Unknown advection scheme '{advection}', expected one of {ADVECTION}.")
+        if pressure_solver != "factorized" and pressure_solver not in krylov.METHODS:
+            raise ValueError(f"Unknown pressure solver '{pressure_solver}', "
+                             f"expected one of {('factorized',) + krylov.METHODS}.")
+
+        self.mesh = mesh
+        self.NU = nu
+        self.TIME_STEP = dt
+        self.ADVECTION = advection
+        self.PRESSURE_SOLVER = pressure_solver
+        self.PRECONDITIONER = preconditioner
+        self.PRESSURE_TOL = pressure_tol
+        self.LU = None
+        self.KRYLOV = None
+        self.BOUNDARIES = classify_boundaries(mesh) if boundaries is None else boundaries
+        unknown = set(self.BOUNDARIES) - set(BOUNDARY_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown boundary kind(s) {sorted(unknown)}, expected {BOUNDARY_KINDS}.")
+
+        n_cells = mesh.n_cells
+        self.u = np.zeros((n_cells, 2)) if u0 is None else np.array(u0, dtype=float)
+        self.p = np.zeros(n_cells)
+        self.phi = np.zeros(mesh.n_faces)
+        self.time = 0.0
+        self.steps = 0
+        self._C_old = None
+        self.probes = []
+        self.history = []
+
+        self._geometry()
+        self.U_INLET = np.broadcast_to(np.asarray(inlet_velocity, dtype=float),
+                                       (len(self._inlet), 2)).copy()
+        self.phi[self._inlet] = np.einsum("ij,ij->i", self.U_INLET, self._n[self._inlet]) * self._A[self._inlet]
+        self._pressure_matrix()
+        self._velocity_matrix()
+
+    # ----------------------------- Set Up --------------------------------------------------------
+
+    def _geometry(self):
+        mesh = self.mesh
+        C = mesh.centroids
+        self._P = mesh.face_owner
+        self._interior = mesh.interior_faces
+        self._boundary = mesh.boundary_faces
+        self._N = mesh.face_neighbour[self._interior]
+        self._n = mesh.face_normals
+        self._A = mesh.face_areas
+        self._x_f = mesh.face_midpoints
+        self._V = mesh.volumes
+
+        # Normal distance between the cell centres across a face (to the face on
+        # the boundary) and the linear interpolation weight of the owner
+        P_int = self._P[self._interior]
+        n_int = self._n[self._interior]
+        delta = np.empty(mesh.n_faces)
+        delta[self._interior] = np.einsum("ij,ij->i", C[self._N] - C[P_int], n_int)
+        delta[self._boundary] = np.einsum("ij,ij->i", self._x_f[self._boundary] - C[self._P[self._boundary]],
+                                          self._n[self._boundary])
+        self._delta = np.abs(delta)
+        self._w = np.abs(np.einsum("ij,ij->i", C[self._N] - self._x_f[self._interior], n_int)) \
+            / self._delta[self._interior]
+        self._coeff = self._A / self._delta
+
+        empty = np.zeros(0, dtype=np.int32)
+        self._inlet = self.BOUNDARIES.get("inlet", empty)
+        self._outlet = self.BOUNDARIES.get("outlet", empty)
+        self._wall = self.BOUNDARIES.get("wall", empty)
+        self._slip = self.BOUNDARIES.get("slip", empty)
+        # Positions of the boundary kinds within boundary_faces
+        self._at = {kind: np.searchsorted(self._boundary, faces) for kind, faces in
+                    (("inlet", self._inlet), ("outlet", self._outlet), ("wall", self._wall), ("slip", self._slip))}
+
+        # Gathers and scatters as sparse matrices, far cheaper per step than
+        # fancy indexing of (n, 2) arrays
+        n_cells, n_faces = mesh.n_cells, mesh.n_faces
+        faces = np.arange(n_faces)
+        interior = self._interior
+        ones = np.ones(n_faces)
+        self._S = csr_matrix((np.r_[ones, -ones[interior]], (np.r_[self._P, self._N], np.r_[faces, interior])),
+                             shape=(n_cells, n_faces))
+        self._EP = csr_matrix((ones, (faces, self._P)), shape=(n_faces, n_cells))
+        self._EN = csr_matrix((ones[interior], (interior, self._N)), shape=(n_faces, n_cells))
+        self._W = csr_matrix((np.r_[self._w, 1 - self._w], (np.r_[interior, interior], np.r_[P_int, self._N])),
+                             shape=(n_faces, n_cells))
+        # Green-Gauss gradient components, sum_f u_f n_f |f| / V
+        self._Gx, self._Gy = [csr_matrix(self._S.multiply(self._n[:, d] * self._A).multiply(1 / self._V[:, None]))
+                              for d in range(2)]
+
+        # Pressure: face values with p = 0 on the outlet and the owner value on the
+        # other boundary faces, face differences p_N - p_P with p = 0 outside the outlet
+        closed = np.setdiff1d(self._boundary, self._outlet)
+        self._W_p = (self._W + csr_matrix((ones[closed], (closed, self._P[closed])),
+                                          shape=(n_faces, n_cells))).tocsr()
+        rows = np.r_[interior, interior, self._outlet]
+        cols = np.r_[self._N, P_int, self._P[self._outlet]]
+        vals = np.r_[ones[interior], -ones[interior], -ones[self._outlet]]
+        self._D = csr_matrix((vals, (rows, cols)), shape=(n_faces, n_cells))
+
+        # Offsets from the owner / neighbour centroid to the face midpoint
+        self._r_P = self._x_f - C[self._P]
+        self._r_N = np.zeros((n_faces, 2))
+        self._r_N[interior] = self._x_f[interior] - C[self._N]
+
+    def _pressure_matrix(self):
+        """
+        Pressure Laplacian with p = 0 on outlet faces, factorized once or with
+        its Krylov solver and preconditioner set up once.
+        """
+        K = diffusion_operator(self.mesh, self._outlet).matrix_csc()
+        if not len(self._outlet):
+            # No pressure level fixed by the boundary, pin the first cell
+            K = K + coo_matrix(([1.0], ([0], [0])), shape=K.shape).tocsc()
+        self.pressure_matrix = K
+        if self.PRESSURE_SOLVER == "factorized":
+            self.LU = factorize_spd(K)
+        else:
+            self.KRYLOV = krylov.KrylovSolver(K, self.PRESSURE_SOLVER, self.PRECONDITIONER,
+                                              tol=self.PRESSURE_TOL)
+
+    def _velocity_matrix(self):
+        """Crank-Nicolson diffusion matrix V / dt + nu K / 2 for both velocity components."""
+        dirichlet = np.concatenate([self._inlet, self._wall])
+        self.diffusion_matrix = diffusion_operator(self.mesh, dirichlet).matrix_csc()
+
+        # Boundary values of the Dirichlet faces enter the right hand side
+        b = np.zeros((self.mesh.n_faces, 2))
+        b[self._inlet] = self.U_INLET
+        b = self._coeff[:, None] * b
+        self._b = np.column_stack([np.bincount(self._P[dirichlet], b[dirichlet, k], self.mesh.n_cells)
+                                   for k in range(2)])
+
+        M = self.diffusion_matrix * (0.5 * self.NU)
+        M.setdiag(M.diagonal() + self._V / self.TIME_STEP)
+        self.velocity_matrix = M
+        self.LU_U = factorize_spd(M)
+
+    def set_time_step(self, dt):
+        """Change the time step, refactorizing the velocity matrix."""
+        if dt != self.TIME_STEP:
+            self.TIME_STEP = dt
+            self._velocity_matrix()
+
+    # ----------------------------- Discrete Operators --------------------------------------------
+
+    def _boundary_velocity(self, u):
+        """Velocity on the boundary faces, (n_boundary, 2) in boundary_faces order."""
+        at = self._at
+        u_b = np.empty((len(self._boundary), 2))
+        u_b[at["inlet"]] = self.U_INLET
+        u_b[at["wall"]] = 0.0
+        u_b[at["outlet"]] = u[self._P[self._outlet]]
+        u_s = u[self._P[self._slip]]
+        n_s = self._n[self._slip]
+        u_b[at["slip"]] = u_s - np.einsum("ij,ij->i", u_s, n_s)[:, None] * n_s
+        return u_b
+
+    def _face_velocity(self, u):
+        """Linear interpolation to the interior faces, boundary values on the boundary."""
+        u_f = self._W @ u
+        u_f[self._boundary] = self._boundary_velocity(u)
+        return u_f
+
+    def gradient(self, u_f):
+        """Green-Gauss cell gradient from face values, (n_cells, ..., 2)."""
+        return np.stack([self._Gx @ u_f, self._Gy @ u_f], axis=-1)
+
+    def _advection(self, u):
+        """Net advective momentum flux sum_f phi_f u_f out of every cell."""
+        phi = self.phi
+        from_owner = (phi >= 0)[:, None]
+
+        if self.ADVECTION == "linear-upwind":
+            # Upwind values reconstructed to the face with the cell gradients
+            u_f = self._face_velocity(u)
+            X = np.hstack([u, self._Gx @ u_f, self._Gy @ u_f])
+            X_P, X_N = self._EP @ X, self._EN @ X
+            u_P = X_P[:, :2] + self._r_P[:, :1] * X_P[:, 2:4] + self._r_P[:, 1:] * X_P[:, 4:]
+            u_N = X_N[:, :2] + self._r_N[:, :1] * X_N[:, 2:4] + self._r_N[:, 1:] * X_N[:, 4:]
+        else:
+            u_P, u_N = self._EP @ u, self._EN @ u
+
+        u_up = np.where(from_owner, u_P, u_N)
+        # Inflow through the boundary carries the boundary value
+        inflow = ~from_owner[self._boundary, 0]
+        u_up[self._boundary[inflow]] = self._boundary_velocity(u)[inflow]
+        return self._S @ (phi[:, None] * u_up)
+
+    # ----------------------------- Time Stepping -------------------------------------------------
+
+    def step(self):
+        """Advance velocity, pressure and face fluxes by one time step."""
+        dt = self.TIME_STEP
+        C = self._advection(self.u)
+        C_ab = C if self._C_old is None else 1.5 * C - 0.5 * self._C_old
+        self._C_old = C
+
+        rhs = (self._V / dt)[:, None] * self.u - 0.5 * self.NU * (self.diffusion_matrix @ self.u) \
+            + self.NU * self._b - C_ab
+        u_hat = self.LU_U.solve(rhs)
+
+        # Predicted face fluxes
+        phi = np.einsum("ij,ij->i", self._face_velocity(u_hat), self._n) * self._A
+
+        # Pressure Poisson equation, -L p = -div(phi*) / dt, warm started from
+        # the previous pressure by the Krylov solver
+        rhs = -(self._S @ phi) / dt
+        self.p = self.LU.solve(rhs) if self.KRYLOV is None else self.KRYLOV.solve(rhs)
+
+        # Project the fluxes with the compact face gradient, the cells with Green-Gauss
+        self.phi = phi - dt * self._coeff * (self._D @ self.p)
+        self.u = u_hat - dt * self.gradient(self._W_p @ self.p)
+
+    def solve(self, t, callback=None, every_n=None, every_t=None):
+        """
+        Advance the flow to time t, headless.
+
+        :param t            :   Final time
+        :param callback     :   Observer called as callback(self) on each output
+        :param every_n      :   Output every every_n steps
+        :param every_t      :   Output every every_t of simulated time
+        :return             :   (velocity, pressure)
+        """
+        if every_n is not None and every_t is not None:
+            raise ValueError("Specify at most one of every_n and every_t.")
+
+        next_output = self.time + every_t if every_t is not None else None
+        while self.time < t - 1e-9 * self.TIME_STEP:
+            self.step()
+            self.time += self.TIME_STEP
+            self.steps += 1
+            self._record()
+
+            if every_t is not None:
+                due = self.time >= next_output - 1e-9 * every_t
+                while next_output <= self.time + 1e-9 * every_t:
+                    next_output += every_t
+            else:
+                due = self.steps % (every_n or 1) == 0
+            if due and callback is not None:
+                callback(self)
+
+        return self.u, self.p
+
+    # ----------------------------- Diagnostics ---------------------------------------------------
+
+    def max_stable_dt(self, cfl=0.5, velocity=None):
+        """
+        Time step limit of the explicit advection, dt = cfl * min(2 V / sum_f |phi_f|).
+
+        :param cfl      :   Courant number
+        :param velocity :   Velocity scale used instead of the current fluxes (e.g.
+                            twice the inlet velocity before the flow has developed)
+        """
+        n_cells = self.mesh.n_cells
+        flux = np.abs(self.phi) if velocity is None else velocity * self._A
+        rate = 0.5 * (np.bincount(self._P, flux, n_cells)
+                      + np.bincount(self._N, flux[self._interior], n_cells)) / self._V
+        return cfl / max(np.max(rate), 1e-300)
+
+    def divergence(self):
+        """Net volume flux out of every cell per unit volume, zero up to the solver tolerance."""
+        return (self._S @ self.phi) / self._V
+
+    def vorticity(self):
+        """Out of plane vorticity dv/dx - du/dy of every cell."""
+        grad = self.gradient(self._face_velocity(self.u))
+        return grad[:, 1, 0] - grad[:, 0, 1]
+
+    def add_probe(self, x, y):
+        """
+        Record the velocity of the cell nearest to (x, y) after every step.
+
+        :return     :   Probe index into the columns of probe_history
+        """
+        cell = int(np.argmin(np.sum((self.mesh.centroids - (x, y)) ** 2, axis=1)))
+        self.probes.append(cell)
+        return len(self.probes) - 1
+
+    def _record(self):
+        if self.probes:
+            self.history.append(self.u[self.probes].copy())
+
+    @property
+    def probe_history(self):
+        """(n_steps, n_probes, 2) velocities recorded by the probes."""
+        return np.array(self.history).reshape(-1, len(self.probes), 2)
+
+    def strouhal(self, probe=0, diameter=1.0, velocity=None, skip=0.5):
+        """Strouhal number from the cross-stream velocity recorded by a probe."""
+        velocity = np.max(np.linalg.norm(self.U_INLET, axis=1)) if velocity is None else velocity
+        return strouhal(self.probe_history[:, probe, 1], self.TIME_STEP, diameter, velocity, skip)
@@ -0,0 +1,342 @@
+import numpy as np
+from scipy.sparse import csr_matrix, diags
+from scipy.sparse.linalg import LinearOperator, bicgstab, cg, gmres, spilu, splu
+
+"""
+Preconditioned Krylov solvers for the large sparse systems of the heat and
+finite volume solvers, where a direct factorization runs out of memory or time.
+
+    cg          symmetric positive definite matrices
+    bicgstab    general matrices, short recurrences
+    gmres       general matrices, restarted
+
+Preconditioners:
+
+    jacobi      inverse diagonal
+    ilu         threshold incomplete LU
+    amg         smoothed aggregation algebraic multigrid, one V-cycle
+
+A KrylovSolver keeps the preconditioner of its matrix: it is set up once and
+reused by every solve until the matrix changes, and each solve starts from the
+previous solution. Iteration counts and true relative residuals are recorded
+per solve.
+"""
+
+METHODS = ("cg", "bicgstab", "gmres")
+PRECONDITIONERS = ("jacobi", "ilu", "amg", None)
+
+
+def jacobi_preconditioner(A):
+    """Inverse diagonal of A."""
+    return diags(1.0 / A.diagonal())
+
+
+def ilu_preconditioner(A, drop_tol=1e-3, symmetric=False):
+    """
+    Incomplete LU that drops the entries below drop_tol (relative to their
+    column). The default SuperLU rule also enforces a fill limit by secondary
+    dropping, which on mesh Laplacians leaves a preconditioner worse than
+    Jacobi (CG no longer converges with the symmetric factors), so only the
+    threshold rule is used and the fill is not bounded. On 3D grids the factors
+    keep several times the entries of A, there the "amg" preconditioner is the
+    cheaper choice.
+
+    :param A            :   Sparse matrix
+    :param drop_tol     :   Relative drop tolerance
+    :param symmetric    :   Symmetric ordering without pivoting, so the incomplete
+                            factors stay (nearly) symmetric for CG
+    :return             :   LinearOperator
+    """
+    options = {"ILU_DropRule": "BASIC"}
+    if symmetric:
+        ilu = spilu(A.tocsc(), drop_tol=drop_tol, permc_spec="MMD_AT_PLUS_A", diag_pivot_thresh=0.0,
+                    options={**options, "SymmetricMode": True})
+    else:
+        ilu = spilu(A.tocsc(), drop_tol=drop_tol, options=options)
+    return LinearOperator(A.shape, ilu.solve)
+
+
+def strength_graph(A, theta=0.08):
+    """
+    Strong connections |a_ij| >= theta sqrt(|a_ii a_jj|), i != j.
+
+    :param A        :   Square CSR matrix
+    :param theta    :   Strength threshold
+    :return         :   CSR pattern of the strong connections
+    """
+    A = csr_matrix(A)
+    rows = np.repeat(np.arange(A.shape[0]), np.diff(A.indptr))
+    d = np.abs(A.diagonal())
+    strong = (rows != A.indices) & (np.abs(A.data) >= theta * np.sqrt(d[rows] * d[A.indices]))
+    return csr_matrix((np.ones(np.count_nonzero(strong)), (rows[strong], A.indices[strong])), shape=A.shape)
+
+
+def _neighbour_max(S, x):
+    """Largest value of x over the graph neighbours of every node, 0 without neighbours."""
+    return np.asarray((S @ diags(x)).max(axis=1).todense()).ravel()
+
+
+def aggregate(S, seed=0):
+    """
+    Aggregation of a strength graph by a distance-2 maximal independent set:
+    the roots are nodes no two of which are within two strong connections of
+    each other, chosen in rounds of local maxima of fixed random priorities.
+    Every root forms an aggregate with its strong neighbours, and the remaining
+    nodes join an aggregate next to them. Nodes without strong connections are
+    left out of every aggregate and only smoothed (their row of the
+    prolongator is the smoothing of their neighbours' aggregates).
+
+    :param S        :   CSR strength graph
+    :param seed     :   Seed of the priorities, fixed so the hierarchy is reproducible
+    :return         :   ((n,) aggregate of every node or -1, number of aggregates)
+    """
+    # Symmetric 0/1 pattern: i and j are connected if either depends strongly on the other
+    S = csr_matrix(S + S.T)
+    S.data[:] = 1.0
+    n = S.shape[0]
+    connected = np.diff(S.indptr) > 0
+    priority = 1.0 + np.random.default_rng(seed).random(n)
+
+    # 0 undecided, 1 root, -1 within distance two of a root or isolated
+    state = np.where(connected, 0, -1)
+    while np.any(state == 0):
+        weight = np.where(state == 0, priority, 0.0)
+        local = np.maximum(weight, _neighbour_max(S, weight))
+        local = np.maximum(local, _neighbour_max(S, local))
+        roots = (state == 0) & (weight == local)
+        state[roots] = 1
+        near = _neighbour_max(S, roots * 1.0) > 0
+        near |= _neighbour_max(S, near * 1.0) > 0
+        state[near & (state == 0)] = -1
+
+    roots = np.flatnonzero(state == 1)
+    agg = np.full(n, -1, dtype=np.int32)
+    agg[roots] = np.arange(len(roots))
+    # Neighbours of a root first (they touch only one), then the nodes next to them
+    while True:
+        joined = _neighbour_max(S, agg + 1.0)
+        free = connected & (agg < 0) & (joined > 0)
+        if not np.any(free):
+            break
+        agg[free] = joined[free] - 1
+    return agg, len(roots)
+
+
+class SmoothedAggregation:
+    def __init__(self, A, theta=0.08, coarse_size=500, max_levels=10, sweeps=1, max_ratio=0.5):
+        """
+        Smoothed aggregation hierarchy: piecewise constant tentative
+        prolongators over the aggregates, smoothed with one damped Jacobi step
+        of the filtered matrix (the strong connections, with the weak ones
+        lumped onto the diagonal so the prolongators do not grow along them),
+        Galerkin coarse operators P^T A P and a direct solve on the coarsest
+        level. The V-cycle uses damped Jacobi pre and post smoothing, so it is
+        symmetric for symmetric A and can precondition CG.
+
+        Coarsening stops once a level keeps more than max_ratio of the unknowns,
+        e.g. when most of them have no strong connections (a small time step).
+        Such a coarsest level is still too large to factorize but strongly
+        diagonally dominant, and it is relaxed by a damped Jacobi step instead.
+
+        :param A            :   Square sparse matrix
+        :param theta        :   Strength threshold of the aggregation
+        :param coarse_size  :   Solve directly below this many unknowns
+        :param max_levels   :   Maximum number of levels
+        :param sweeps       :   Smoothing sweeps before and after the coarse correction
+        :param max_ratio    :   Largest fraction of the unknowns a coarser level may keep
+        """
+        self.SWEEPS = sweeps
+        self.levels = []
+
+        A = csr_matrix(A, dtype=float)
+        self.shape = A.shape
+        while A.shape[0] > coarse_size and len(self.levels) < max_levels - 1:
+            D_inv, omega = self._jacobi(A)
+
+            S = strength_graph(A, theta)
+            agg, n_agg = aggregate(S)
+            if n_agg == 0 or n_agg > max_ratio * A.shape[0]:
+                break
+
+            # Filtered matrix: strong connections, weak ones lumped onto the diagonal
+            off_diagonal = A - diags(A.diagonal())
+            strong = off_diagonal.multiply(S).tocsr()
+            weak = np.asarray((off_diagonal - strong).sum(axis=1)).ravel()
+            A_F = (strong + diags(A.diagonal() + weak)).tocsr()
+            D_F_inv, omega_F = self._jacobi(A_F)
+
+            nodes = np.flatnonzero(agg >= 0)
+            sizes = np.bincount(agg[nodes], minlength=n_agg)
+            T = csr_matrix((1.0 / np.sqrt(sizes[agg[nodes]]), (nodes, agg[nodes])), shape=(A.shape[0], n_agg))
+            P = (T - omega_F * (diags(D_F_inv) @ (A_F @ T))).tocsr()
+            R = P.T.tocsr()
+
+            self.levels.append({"A": A, "P": P, "R": R, "D_inv": D_inv, "omega": omega})
+            A = (R @ A @ P).tocsr()
+
+        if A.shape[0] <= coarse_size:
+            self.coarse = splu(A.tocsc()).solve
+        else:
+            D_inv, omega = self._jacobi(A)
+            self.coarse = lambda b: omega * D_inv * b
+        self.coarse_shape = A.shape
+
+    @staticmethod
+    def _jacobi(A):
+        """Inverse diagonal and damping 4 / (3 rho) of the Jacobi iteration of A."""
+        D_inv = 1.0 / A.diagonal()
+        # Gershgorin bound of the spectral radius of D^-1 A
+        rho = np.max(np.asarray(abs(A).sum(axis=1)).ravel() * np.abs(D_inv))
+        return D_inv, 4.0 / (3.0 * rho)
+
+    @property
+    def sizes(self):
+        """Number of unknowns on every level, finest first."""
+        return [level["A"].shape[0] for level in self.levels] + [self.coarse_shape[0]]
+
+    def vcycle(self, b, k=0):
+        """One V-cycle for A_k x = b from a zero guess."""
+        if k == len(self.levels):
+            return self.coarse(b)
+
+        level = self.levels[k]
+        A, D_inv, omega = level["A"], level["D_inv"], level["omega"]
+        x = omega * D_inv * b
+        for _ in range(self.SWEEPS - 1):
+            x += omega * D_inv * (b - A @ x)
+
+        x += level["P"] @ self.vcycle(level["R"] @ (b - A @ x), k + 1)
+
+        for _ in range(self.SWEEPS):
+            x += omega * D_inv * (b - A @ x)
+        return x
+
+    def aslinearoperator(self):
+        return LinearOperator(self.shape, self.vcycle)
+
+
+def build_preconditioner(A, kind, symmetric=False):
+    """
+    :param A            :   Sparse matrix
+    :param kind         :   One of PRECONDITIONERS
+    :param symmetric    :   A is symmetric and the preconditioner is used by CG
+    :return             :   LinearOperator (or sparse matrix) approximating A^-1, None
+                            for no preconditioner
+    """
+    if kind not in PRECONDITIONERS:
+        raise ValueError(f"Unknown preconditioner '{kind}', expected one of {PRECONDITIONERS}.")
+    if kind == "jacobi":
+        return jacobi_preconditioner(A)
+    if kind == "ilu":
+        return ilu_preconditioner(A, symmetric=symmetric)
+    if kind == "amg":
+        return SmoothedAggregation(A).aslinearoperator()
+    return None
+
+
+def _fingerprint(A):
+    return A.shape, A.nnz, hash(A.indptr.tobytes()), hash(A.indices.tobytes()), hash(A.data.tobytes())
+
+
+class KrylovSolver:
+    def __init__(self, A, method="cg", preconditioner="ilu", tol=1e-8, maxiter=None, restart=30):
+        """
+        :param A                :   Sparse matrix
+        :param method           :   "cg", "bicgstab" or "gmres"
+        :param preconditioner   :   One of PRECONDITIONERS, or a LinearOperator
+                                    approximating A^-1 (e.g. a geometric multigrid cycle)
+        :param tol              :   Relative residual tolerance
+        :param maxiter          :   Maximum number of iterations per solve
+        :param restart          :   Krylov subspace size of restarted GMRES
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown Krylov method '{method}', expected one of {METHODS}.")
+        if isinstance(preconditioner, str) and preconditioner not in PRECONDITIONERS:
+            raise ValueError(f"Unknown preconditioner '{preconditioner}', expected one of {PRECONDITIONERS}.")
+
+        self.METHOD = method
+        self.PRECONDITIONER = preconditioner
+        self.TOL = tol
+        self.MAXITER = maxiter
+        self.RESTART = restart
+        self.A = None
+        self.M = None
+        self.x = None
+        self.setups = 0
+        self.iterations = 0
+        self.residual = None
+        self.history = []
+        self._key = None
+        self.set_matrix(A)
+
+    def set_matrix(self, A, rebuild=True):
+        """
+        Switch to another matrix. The preconditioner is only rebuilt when the
+        matrix actually changed (by content), rebuild=False keeps the old one
+        for a slowly varying matrix.
+        """
+        self.A = csr_matrix(A)
+        if self.PRECONDITIONER is None or not isinstance(self.PRECONDITIONER, str):
+            self.M = self.PRECONDITIONER
+            return
+
+        key = _fingerprint(self.A)
+        if self.M is None or (rebuild and key != self._key):
+            self.M = build_preconditioner(self.A, self.PRECONDITIONER, symmetric=self.METHOD == "cg")
+            self._key = key
+            self.setups += 1
+
+    def solve(self, b, x0=None):
+        """
+        Solve A x = b, warm started from x0 or else the previous solution.
+        Several right hand sides (columns of b) are solved one after another.
+
+        :param b    :   (n,) or (n, M) right hand side
+        :param x0   :   Initial guess
+        :return     :   Solution of the shape of b
+        """
+        b = np.asarray(b, dtype=float)
+        if b.ndim == 2:
+            return np.column_stack([self.solve(b[:, m], None if x0 is None else x0[:, m])
+                                    for m in range(b.shape[1])])
+
+        if x0 is None and self.x is not None and self.x.shape == b.shape:
+            x0 = self.x
+
+        count = [0]
+
+        def count_iterations(_):
+            count[0] += 1
+
+        options = {"x0": x0, "rtol": self.TOL, "atol": 0.0, "maxiter": self.MAXITER, "M": self.M,
+                   "callback": count_iterations}
+        if self.METHOD == "cg":
+            x, info = cg(self.A, b, **options)
+        elif self.METHOD == "bicgstab":
+            x, info = bicgstab(self.A, b, **options)
+        else:
+            x, info = gmres(self.A, b, restart=self.RESTART, callback_type="pr_norm", **options)
+
+        norm_b = np.linalg.norm(b)
+        self.iterations = count[0]
+        self.residual = np.linalg.norm(b - self.A @ x) / norm_b if norm_b > 0 else np.linalg.norm(x)
+        self.history.append((self.iterations, self.residual))
+        if info != 0:
+            raise RuntimeError(f"{self.METHOD} did not converge in {self.iterations} iterations "
+                               f"(relative residual {self.residual:.2e}).")
+
+        self.x = x
+        return x
+
+    def report(self):
+        """Iteration and residual summary over all solves so far."""
+        if not self.history:
+            return {"solves": 0, "setups": self.setups}
+        iterations, residuals = np.array(self.history).T
+        return {"solves": len(self.history), "setups": self.setups,
+                "iterations": int(iterations.sum()), "mean_iterations": float(iterations.mean()),
+                "max_iterations": int(iterations.max()), "max_residual": float(residuals.max())}
+
+    def __repr__(self):
+        return (f"KrylovSolver({self.METHOD}, preconditioner {self.PRECONDITIONER!r}, "
+                f"{self.A.shape[0]} unknowns, {len(self.history)} solves)")
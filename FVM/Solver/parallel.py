@@ -0,0 +1,91 @@
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+"""
+Multi-process time stepping on a partitioned mesh.
+
+Every partition runs in its own process. The global field lives in two shared
+memory buffers that alternate between steps: a step reads the halo cells
+from the current buffer (recv lists), computes the new values of the owned
+cells, and writes the cells other parts need (send lists) into the next
+buffer. One barrier per step separates the writes from the next reads, and
+with the double buffer no process can overwrite values a slower one is still
+reading.
+
+The model is given as a factory, called once inside each worker with its
+Partition, that returns step(u_local) -> new values of the owned cells. Both
+must be picklable (module level functions or classes).
+"""
+
+
+def _worker(partition, factory, shm_name, shape, steps, barrier):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        buffers = np.ndarray((2,) + shape, dtype=np.float64, buffer=shm.buf)
+        step = factory(partition)
+
+        u = buffers[0][partition.cells].copy()
+        halo = partition.halo
+        send = np.concatenate(list(partition.send.values())) if partition.send else np.zeros(0, dtype=np.int32)
+        send_global = partition.cells[send]
+
+        n_owned = partition.n_owned
+        for s in range(steps):
+            u[n_owned:] = buffers[s % 2][halo]
+            u[:n_owned] = step(u)
+            buffers[(s + 1) % 2][send_global] = u[send]
+            barrier.wait()
+
+        buffers[steps % 2][partition.owned] = u[:n_owned]
+        del buffers
+    except BaseException:
+        # Release the other workers instead of leaving them at the barrier
+        barrier.abort()
+        raise
+    finally:
+        shm.close()
+
+
+def run_partitioned(partitions, factory, u0, steps, timeout=None):
+    """
+    Advance a field on a partitioned mesh with one process per partition.
+
+    :param partitions   :   Partitions from partition_mesh
+    :param factory      :   factory(partition) -> step(u_local) -> (n_owned, ...) values
+    :param u0           :   (n_cells,) or (n_cells, m) initial field, global numbering
+    :param steps        :   Number of steps
+    :param timeout      :   Seconds a worker waits at a barrier before giving up
+    :return             :   Field after the last step, global numbering
+    """
+    u0 = np.asarray(u0, dtype=np.float64)
+    shape = u0.shape
+    ctx = mp.get_context()
+
+    shm = shared_memory.SharedMemory(create=True, size=max(2 * u0.nbytes, 1))
+    try:
+        buffers = np.ndarray((2,) + shape, dtype=np.float64, buffer=shm.buf)
+        buffers[0] = u0
+        buffers[1] = u0
+
+        barrier = ctx.Barrier(len(partitions), timeout=timeout)
+        workers = [ctx.Process(target=_worker, args=(part, factory, shm.name, shape, steps, barrier),
+                               name=f"partition-{part.rank}")
+                   for part in partitions]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        failed = [worker.name for worker in workers if worker.exitcode != 0]
+        if failed:
+            raise RuntimeError(f"Partition worker(s) failed: {', '.join(failed)}")
+
+        result = buffers[steps % 2].copy()
+        del buffers
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return result
@@ -0,0 +1,124 @@
+import importlib
+import json
+import os
+
+import numpy as np
+from scipy.sparse import csc_matrix
+
+"""
+Checkpoint and restart of heat equation runs.
+
+A checkpoint is a single .npz file holding the temperature field, the time, the
+step count, the solver class and its constructor parameters, the arrays the
+class needs to rebuild itself (the mesh of HeatEqnFVM), and optionally the
+assembled A / Ac matrices. It is written to a temporary file in the same
+directory and moved over the previous checkpoint with os.replace, so a crash
+while writing always leaves the last complete checkpoint behind.
+
+SuperLU factorizations cannot be serialized, so a resumed run factorizes A
+again (one factorization, no reassembly when the matrices were stored). The
+matrices belong to the time step of the solver when it was saved, which inside
+solve_adaptive may differ from the constructor time step the solver is rebuilt
+with. They are only reused when the two match.
+"""
+
+
+def _json_default(value):
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Cannot store {type(value).__name__} in a checkpoint.")
+
+
+def save_checkpoint(heat_eqn, path, operators=False):
+    """
+    Atomically write the state of a heat equation solver.
+
+    :param heat_eqn     :   HeatEqnBase instance
+    :param path         :   Checkpoint file, .npz
+    :param operators    :   Also store the assembled A and Ac matrices
+    :return             :   None
+    """
+    cls = type(heat_eqn)
+    state = {
+        "field": np.asarray(heat_eqn.b),
+        "time": np.float64(heat_eqn.time),
+        "steps": np.int64(heat_eqn.steps),
+        "model": np.array(f"{cls.__module__}:{cls.__qualname__}"),
+        "params": np.array(json.dumps(heat_eqn.PARAMS, default=_json_default)),
+    }
+    for name, value in heat_eqn.checkpoint_arrays().items():
+        state[f"array_{name}"] = np.asarray(value)
+    if operators and heat_eqn.A is not None:
+        state["operators_dt"] = np.float64(heat_eqn.TIME_STEP)
+        for name in ("A", "Ac"):
+            M = csc_matrix(getattr(heat_eqn, name))
+            state[f"{name}_data"] = M.data
+            state[f"{name}_indices"] = M.indices
+            state[f"{name}_indptr"] = M.indptr
+            state[f"{name}_shape"] = np.array(M.shape)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp = os.path.join(directory, f".{os.path.basename(path)}.tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, **state)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path):
+    """
+    Rebuild a heat equation solver from a checkpoint.
+
+    :param path     :   Checkpoint file written by save_checkpoint
+    :return         :   Solver positioned at the checkpointed time
+    """
+    with np.load(path, allow_pickle=False) as state:
+        module, name = str(state["model"]).split(":")
+        cls = getattr(importlib.import_module(module), name)
+        params = json.loads(str(state["params"]))
+        arrays = {key[len("array_"):]: state[key] for key in state.files if key.startswith("array_")}
+
+        heat_eqn = cls.from_checkpoint(params, np.array(state["field"]), arrays)
+        heat_eqn.time = float(state["time"])
+        heat_eqn.steps = int(state["steps"])
+
+        # Matrices assembled for another (adaptive) time step are rebuilt instead
+        if "A_data" in state and float(state["operators_dt"]) == heat_eqn.TIME_STEP:
+            for attr in ("A", "Ac"):
+                M = csc_matrix((state[f"{attr}_data"], state[f"{attr}_indices"], state[f"{attr}_indptr"]),
+                               shape=tuple(state[f"{attr}_shape"]))
+                setattr(heat_eqn, attr, M)
+
+    return heat_eqn
+
+
+def resume(path, **kwargs):
+    """
+    Continue a run from its checkpoint until its final time.
+
+    :param path     :   Checkpoint file
+    :param kwargs   :   Passed on to solve (headless, callback, every_n ...)
+    :return         :   The resumed solver
+    """
+    heat_eqn = load_checkpoint(path)
+    heat_eqn.solve(**kwargs)
+    return heat_eqn
+
+
+class Checkpointer:
+    def __init__(self, path, operators=False):
+        """
+        Solve callback that checkpoints the run on every output. Pair it with
+        every_n or every_t of solve to set the interval.
+
+        :param path         :   Checkpoint file, overwritten atomically each time
+        :param operators    :   Also store the assembled A and Ac matrices
+        """
+        self.PATH = path
+        self.OPERATORS = operators
+        self.count = 0
+
+    def __call__(self, heat_eqn):
+        save_checkpoint(heat_eqn, self.PATH, operators=self.OPERATORS)
+        self.count += 1
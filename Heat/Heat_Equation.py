@@ -0,0 +1,597 @@
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.figure import Figure
+from scipy.sparse.linalg import spsolve, splu
+
+from FVM.Solver import krylov
+from Heat import Operator_Assembly as oa
+from Heat.Multigrid import MultigridSolver
+from Heat.Smoother import BlockSmoother
+from Heat.Stencil import StencilStepper, max_stable_dt
+
+"""
+Heat equation subjected to the following
+
+If using the explicit method check stability condition for explicit method 
+(Courant–Friedrichs–Lewy condition)
+
+The Crank Nicolson approximate solutions can still contain spurious oscillations 
+if the ratio of (time step Δt * thermal diffusivity) over the square of space step 
+Δx^2 is larger than 1/2
+
+Dirichlet Boundary Conditions:
+u[t, 0] = 0 = u[t, length]
+
+Neumann Boundary Conditons:
+dT/dt[t, 0] = 0 = dT/dt[t, length]
+"""
+
+
+class HeatEqnBase:
+    SOLVERS = ("factorized", "spsolve", "cg", "bicgstab", "gmres", "multigrid", "relaxation")
+    PRECONDITIONERS = ("ilu", "jacobi", "amg", "multigrid", None)
+    SCHEMES = ("crank-nicolson", "explicit")
+    BACKENDS = ("sparse", "stencil")
+
+    def __init__(self, k, rho, c_p, N, dt, t, length, T_i, solver="factorized",
+                 scheme="crank-nicolson", backend="sparse", preconditioner="ilu", tol=1e-8, workers=None):
+        if isinstance(length, (float, int)):
+            self.DIM = 1
+            self.LENGTH = [length]
+        elif hasattr(length, "__iter__"):
+            self.DIM = len(length)
+            self.LENGTH = length
+
+        if solver not in self.SOLVERS:
+            raise ValueError(f"Unknown solver '{solver}', expected one of {self.SOLVERS}.")
+        if scheme not in self.SCHEMES:
+            raise ValueError(f"Unknown scheme '{scheme}', expected one of {self.SCHEMES}.")
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {self.BACKENDS}.")
+        if preconditioner not in self.PRECONDITIONERS:
+            raise ValueError(f"Unknown preconditioner '{preconditioner}', "
+                             f"expected one of {self.PRECONDITIONERS}.")
+
+        # N is either the number of points along every axis or one count per axis
+        if hasattr(N, "__iter__"):
+            self.SHAPE = tuple(int(n) for n in N)
+        else:
+            self.SHAPE = (int(N),) * self.DIM
+        if len(self.SHAPE) != self.DIM:
+            raise ValueError(f"Expected {self.DIM} grid sizes, got {len(self.SHAPE)}.")
+        if np.shape(T_i) != self.SHAPE:
+            raise ValueError(f"Initial field of shape {np.shape(T_i)} does not match grid {self.SHAPE}.")
+
+        self.PARAMS = {"k": k, "rho": rho, "c_p": c_p, "N": N, "dt": dt, "t": t, "length": length,
+                       "solver": solver, "scheme": scheme, "backend": backend,
+                       "preconditioner": preconditioner, "tol": tol, "workers": workers}
+        self.NUM_PT = N
+        self.SPACING = [l / (n - 1) for l, n in zip(self.LENGTH, self.SHAPE)]
+        self.SOLVER = solver
+        self.SCHEME = scheme
+        self.BACKEND = backend
+        self.PRECONDITIONER = preconditioner
+        self.TOL = tol
+        self.WORKERS = workers
+        self.TIME_STEP = dt
+        self.TIME = t
+        self.ALPHA = k / (rho * c_p)
+        self.b = T_i
+        self.A = None
+        self.Ac = None
+        self.LU = None
+        self.STENCIL = None
+        self.KRYLOV = None
+        self.MULTIGRID = None
+        self.SMOOTHER = None
+        self._operators = {}
+        self._cache_operators = True
+        self.iterations = 0
+        self.residual = None
+        self.rejected = 0
+        self.steady = False
+        self.LIMIT_Y = np.max(T_i)
+        self.GRID = None
+        self.time = 0
+        self.steps = 0
+        self.fig, self.ax = None, None
+
+    @classmethod
+    def from_checkpoint(cls, params, field, arrays):
+        """
+        Rebuild a solver from the contents of a checkpoint (see Heat.Checkpoint).
+
+        :param params   :   Constructor parameters (PARAMS)
+        :param field    :   Temperature field
+        :param arrays   :   Arrays returned by checkpoint_arrays
+        :return         :   Solver at time zero
+        """
+        args = [params.pop(key) for key in ("k", "rho", "c_p", "N", "dt", "t", "length")]
+        return cls(*args, field, **params)
+
+    def checkpoint_arrays(self):
+        """Arrays besides the field needed to rebuild the solver, none on the structured grids."""
+        return {}
+
+    def construct_grid(self):
+        raise NotImplementedError("This method should be implemented in child classes.")
+
+    def build_matrix(self):
+        """
+        Assemble the Crank-Nicolson matrices from the Kronecker sum Laplacian.
+        The explicit scheme and the stencil backend evaluate L T without a matrix.
+        """
+        if self.SCHEME == "explicit" or self.BACKEND == "stencil":
+            self.STENCIL = StencilStepper(self.SHAPE, self.SPACING, self.ALPHA, self.TIME_STEP)
+        if self.SCHEME == "explicit":
+            self.STENCIL.check_stability()
+            return
+
+        # Matrices restored from a checkpoint are kept as they are
+        if self.A is None:
+            self.A, self.Ac = oa.crank_nicolson(self.SHAPE, self.SPACING, self.ALPHA, self.TIME_STEP)
+
+    def step(self):
+        """Advance the temperature field by one time step."""
+        if self.SCHEME == "explicit":
+            self.b = self.STENCIL.explicit_step(self.b)
+            return
+
+        if self.BACKEND == "stencil":
+            rhs = self.STENCIL.rhs(self.b).ravel()
+        else:
+            rhs = self.Ac.dot(np.ravel(self.b))
+        self.b = self.linear_solve(rhs).reshape(self.SHAPE)
+
+    def solve(self, headless=False, callback=None, every_n=None, every_t=None, pause=0.1):
+        """
+        Advance the solution until self.TIME.
+
+        Output (the callback and, unless headless, the plot) is throttled to every
+        every_n steps or every every_t of simulated time. With neither given it
+        fires on every step.
+
+        :param headless     :   Never touch matplotlib
+        :param callback     :   Observer called as callback(self) on each output
+        :param every_n      :   Output every every_n steps
+        :param every_t      :   Output every every_t of simulated time
+        :param pause        :   Seconds to pause after each redraw
+        :return             :   Final temperature field
+        """
+        self._start_output(headless, every_n, every_t)
+        self.construct_grid()  # Ensure grid is initialized
+        self.build_matrix()
+        self.factorize()
+
+        while self.time < self.TIME:
+            self.step()
+            self.time += self.TIME_STEP
+            self.steps += 1
+            self._output(headless, callback, every_n, every_t, pause)
+
+        return self.b
+
+    def solve_adaptive(self, tol=1e-3, steady_tol=None, dt_min=None, dt_max=None, headless=False,
+                       callback=None, every_n=None, every_t=None, pause=0.1):
+        """
+        Advance the solution until self.TIME with an adaptive time step.
+
+        The local error is estimated by step doubling: one step of dt against two
+        steps of dt / 2, err = max|T_dt - T_dt/2| / (2^p - 1) for a scheme of
+        order p (2 for Crank-Nicolson, 1 for the explicit scheme). A step is
+        accepted when err <= tol * max|T|. The time step only moves by factors of
+        two from self.TIME_STEP, so the operators for each time step are
+        assembled and factorized once and then reused from a cache. A last step
+        clipped to the end time uses one-off operators that are not cached. The
+        explicit scheme starts from and returns to the largest stable step of
+        this sequence when self.TIME_STEP is above the CFL limit.
+
+        :param tol          :   Relative local error tolerance
+        :param steady_tol   :   Stop once max|dT/dt| drops below this value
+        :param dt_min       :   Smallest allowed time step
+        :param dt_max       :   Largest allowed time step
+        :return             :   Final temperature field
+        """
+        dt_0 = self.TIME_STEP
+        dt_min = dt_0 / 2 ** 10 if dt_min is None else dt_min
+        dt_max = self.TIME if dt_max is None else dt_max
+        order = 2
+        if self.SCHEME == "explicit":
+            order = 1
+            dt_stable = max_stable_dt(self.SPACING, self.ALPHA)
+            dt_max = min(dt_max, dt_stable)
+            while dt_0 > dt_stable:
+                dt_0 /= 2
+
+        self._start_output(headless, every_n, every_t)
+        self.construct_grid()  # Ensure grid is initialized
+        self.steady = False
+        self.rejected = 0
+
+        dt = dt_0
+        while dt > dt_max:
+            dt /= 2
+
+        while self.time < self.TIME:
+            h = min(dt, self.TIME - self.time)
+            clipped = h < dt
+            # Copy, the explicit steps write into the buffers of the stepper
+            T_old = np.array(self.b)
+
+            self.set_time_step(h, cache=not clipped)
+            self.step()
+            T_full = np.array(self.b)
+
+            self.b = np.array(T_old)
+            self.set_time_step(h / 2, cache=not clipped)
+            self.step()
+            self.step()
+            T_half = self.b
+
+            err = np.max(np.abs(T_half - T_full)) / (2 ** order - 1)
+            scale = tol * max(np.max(np.abs(T_half)), np.finfo(float).tiny)
+            if err > scale and h / 2 >= dt_min:
+                self.b = T_old
+                self.rejected += 1
+                dt /= 2
+                continue
+
+            self.time += h
+            self.steps += 1
+            self._output(headless, callback, every_n, every_t, pause)
+
+            if steady_tol is not None and np.max(np.abs(T_half - T_old)) / h < steady_tol:
+                self.steady = True
+                break
+
+            # The local error of an order p step scales with dt^(p + 1)
+            if err * 2 ** (order + 1) < 0.5 * scale and 2 * dt <= dt_max:
+                dt *= 2
+
+        self.set_time_step(dt_0)
+        return self.b
+
+    def solve_ensemble(self, fields, callback=None, every_n=None, every_t=None):
+        """
+        Advance a stack of initial fields that share the material, grid and time
+        step. The operators are assembled and factorized once and every step is a
+        single multi right hand side solve. The run is always headless.
+
+        The iterative solvers have no multi right hand side form and loop over the
+        members instead.
+
+        :param fields       :   Initial fields of shape (M, *self.SHAPE)
+        :param callback     :   Observer called as callback(self) on each output,
+                                the current stack is self.ensemble
+        :param every_n      :   Output every every_n steps
+        :param every_t      :   Output every every_t of simulated time
+        :return             :   Final fields of shape (M, *self.SHAPE)
+        """
+        fields = np.array(fields, dtype=float)
+        if fields.shape[1:] != self.SHAPE:
+            raise ValueError(f"Ensemble of shape {fields.shape} does not match grid {self.SHAPE}.")
+
+        self._start_output(True, every_n, every_t)
+        self.construct_grid()  # Ensure grid is initialized
+        self.build_matrix()
+        self.factorize()
+
+        members = fields.shape[0]
+        stencil = None
+        if self.SCHEME == "explicit" or self.BACKEND == "stencil":
+            stencil = StencilStepper(self.SHAPE, self.SPACING, self.ALPHA, self.TIME_STEP, batch=members)
+
+        self.ensemble = fields
+        while self.time < self.TIME:
+            self.ensemble = self.step_ensemble(self.ensemble, stencil)
+            self.time += self.TIME_STEP
+            self.steps += 1
+            self._output(True, callback, every_n, every_t, 0)
+
+        return self.ensemble
+
+    def step_ensemble(self, fields, stencil=None):
+        """Advance a stack of fields of shape (M, *self.SHAPE) by one time step."""
+        if self.SCHEME == "explicit":
+            return stencil.explicit_step(fields)
+
+        members = fields.shape[0]
+        if self.BACKEND == "stencil":
+            rhs = stencil.rhs(fields).reshape(members, -1).T
+        else:
+            rhs = self.Ac.dot(fields.reshape(members, -1).T)
+
+        if self.SOLVER == "factorized":
+            x = self.LU.solve(np.asfortranarray(rhs))
+        elif self.SOLVER == "spsolve":
+            x = spsolve(self.A, rhs)
+        else:
+            single = self.b
+            x = np.empty_like(rhs)
+            for m in range(members):
+                self.b = fields[m]  # Warm start from the member's own field
+                x[:, m] = self.linear_solve(rhs[:, m])
+            self.b = single
+
+        return x.T.reshape(fields.shape)
+
+    def set_time_step(self, dt, cache=True):
+        """
+        Switch the operators to another time step. The operators of every time
+        step seen so far are cached, so switching back does not reassemble or
+        refactorize anything.
+
+        :param dt       :   New time step
+        :param cache    :   False for a one-off time step, its operators are
+                            dropped instead of cached when switching away
+        """
+        names = ("A", "Ac", "LU", "STENCIL", "KRYLOV", "MULTIGRID", "SMOOTHER")
+        if self.TIME_STEP == dt and (self.A is not None or self.STENCIL is not None):
+            return
+
+        if (self.A is not None or self.STENCIL is not None) and self._cache_operators:
+            self._operators[self.TIME_STEP] = tuple(getattr(self, name) for name in names)
+
+        self._cache_operators = cache or dt in self._operators
+        self.TIME_STEP = dt
+        if dt in self._operators:
+            for name, value in zip(names, self._operators[dt]):
+                setattr(self, name, value)
+        else:
+            for name in names:
+                setattr(self, name, None)
+            self.build_matrix()
+            self.factorize()
+
+    def _start_output(self, headless, every_n, every_t):
+        if every_n is not None and every_t is not None:
+            raise ValueError("Specify at most one of every_n and every_t.")
+
+        if not headless:
+            plt.ion()
+            if self.fig is None:
+                self.fig, self.ax = self.create_figure()
+
+        self._next_output = self.time + every_t if every_t is not None else None
+
+    def _output(self, headless, callback, every_n, every_t, pause):
+        if every_t is not None:
+            # Tolerance guards against the round-off in the accumulated time
+            due = self.time >= self._next_output - 1e-9 * every_t
+            while self._next_output <= self.time + 1e-9 * every_t:
+                self._next_output += every_t
+        else:
+            due = self.steps % (every_n or 1) == 0
+
+        if due:
+            if callback is not None:
+                callback(self)
+            if not headless:
+                self.update_plot(self.time)
+                plt.pause(pause)
+
+    def factorize(self):
+        """
+        Factorize the implicit matrix A once. A only depends on the time step and
+        the grid, so every step afterwards only needs the triangular solves.
+
+        For the Krylov solvers the Dirichlet rows are eliminated, which leaves the
+        symmetric positive definite interior block A_II, and the solver with its
+        preconditioner is set up once instead. The multigrid and relaxation
+        solvers work on the grid without the matrix.
+        """
+        if self.A is None:
+            return
+
+        if self.SOLVER == "factorized":
+            self.LU = splu(self.A)
+        elif self.SOLVER == "multigrid":
+            self.MULTIGRID = self.build_multigrid()
+        elif self.SOLVER == "relaxation":
+            self.SMOOTHER = BlockSmoother(self.SHAPE, self.SPACING, 0.5 * self.TIME_STEP * self.ALPHA,
+                                          shift=1.0, omega="optimal", workers=self.WORKERS, tol=self.TOL)
+        elif self.SOLVER in krylov.METHODS:
+            interior = np.flatnonzero(oa.interior_mask(self.SHAPE))
+            boundary = np.flatnonzero(~oa.interior_mask(self.SHAPE))
+            rows = self.A[interior]
+            A_II = rows[:, interior].tocsr()
+            A_IB = rows[:, boundary].tocsr()
+
+            M = self.PRECONDITIONER
+            if M == "multigrid":
+                self.MULTIGRID = self.build_multigrid()
+                M = self.MULTIGRID.preconditioner(interior)
+
+            self.KRYLOV = {"interior": interior, "boundary": boundary, "A_IB": A_IB,
+                           "solver": krylov.KrylovSolver(A_II, self.SOLVER, M, tol=self.TOL)}
+
+    def linear_solve(self, rhs):
+        """Solve A x = rhs with the selected solver."""
+        if self.SOLVER == "factorized":
+            return self.LU.solve(rhs)
+        if self.SOLVER in krylov.METHODS:
+            return self._krylov_solve(rhs)
+        if self.SOLVER == "multigrid":
+            x = self.MULTIGRID.solve(rhs, x0=self.b)
+            self.iterations = self.MULTIGRID.iterations
+            return x.ravel()
+        if self.SOLVER == "relaxation":
+            x = self.SMOOTHER.solve(rhs, x0=self.b)
+            self.iterations = self.SMOOTHER.iterations
+            self.residual = self.SMOOTHER.residual
+            return x.ravel()
+        return spsolve(self.A, rhs)
+
+    def build_multigrid(self):
+        """Geometric multigrid hierarchy for the implicit Crank-Nicolson matrix A."""
+        return MultigridSolver(self.SHAPE, self.SPACING, 0.5 * self.TIME_STEP * self.ALPHA,
+                               shift=1.0, tol=self.TOL, workers=self.WORKERS)
+
+    def solve_steady(self, method="red-black", tol=None, maxiter=100000):
+        """
+        Relax the field to the steady state L T = 0 for its current boundary
+        values, with the threaded row-block smoother (SOR for red-black).
+
+        :param method   :   "red-black" or "jacobi"
+        :param tol      :   Relative residual tolerance, defaults to the solver tolerance
+        :param maxiter  :   Maximum number of sweeps
+        :return         :   Steady temperature field
+        """
+        smoother = BlockSmoother(self.SHAPE, self.SPACING, 1.0, shift=0.0, method=method, omega="optimal",
+                                 workers=self.WORKERS, tol=self.TOL if tol is None else tol, maxiter=maxiter)
+        f = np.where(oa.interior_mask(self.SHAPE), 0.0, self.b)
+        self.b = smoother.solve(f, x0=self.b)
+        self.iterations = smoother.iterations
+        self.residual = smoother.residual
+        self.steady = True
+        return self.b
+
+    def _krylov_solve(self, rhs):
+        """
+        Preconditioned Krylov solve on the interior unknowns, warm started from
+        the current temperature field.
+        """
+        K = self.KRYLOV
+        x = np.array(rhs, dtype=float)
+        x_B = x[K["boundary"]]
+        rhs_I = x[K["interior"]] - K["A_IB"].dot(x_B)
+        x0 = np.ravel(self.b)[K["interior"]]
+
+        solver = K["solver"]
+        x[K["interior"]] = solver.solve(rhs_I, x0=x0)
+        self.iterations = solver.iterations
+        self.residual = solver.residual
+        return x
+
+    def create_figure(self):
+        """Create the figure used by update_plot."""
+        return plt.subplots()
+
+    def update_plot(self, time):
+        raise NotImplementedError("This method should be implemented in child classes.")
+
+
+class HeatEqn1D(HeatEqnBase):
+    def __init__(self, k, rho, c_p, N, dt, t, length, T_i, **kwargs):
+        super().__init__(k, rho, c_p, N, dt, t, length, T_i, **kwargs)
+        self.SPACE_STEP_X_1 = self.SPACING[0]
+
+    def construct_grid(self):
+        grid_range = np.linspace(0, self.LENGTH[0], self.SHAPE[0])
+        self.GRID = grid_range
+
+        return grid_range
+
+    def update_plot(self, time):
+        """Updates the plot with the current temperature profile and time."""
+        self.ax.clear()
+        self.ax.plot(self.GRID, self.b, label=f"t={time:.2f}")
+        self.ax.set_xlabel("Position")
+        self.ax.set_ylabel("Temperature")
+        self.ax.set_ylim(0, self.LIMIT_Y)  # Set y-axis limits
+        self.ax.legend()
+        plt.draw()
+
+
+class HeatEqn2D(HeatEqnBase):
+    def __init__(self, k, rho, c_p, N, dt, t, length, T_i, **kwargs):
+        super().__init__(k, rho, c_p, N, dt, t, length, T_i, **kwargs)
+        self.SPACE_STEP_X_1 = self.SPACING[0]
+        self.SPACE_STEP_X_2 = self.SPACING[1]
+        self.colorbar = None
+
+    def construct_grid(self):
+        x = np.linspace(0, self.LENGTH[0], self.SHAPE[0])
+        y = np.linspace(0, self.LENGTH[1], self.SHAPE[1])
+        self.GRID = np.meshgrid(x, y, indexing='ij')
+        return self.GRID
+
+    def update_plot(self, time):
+        """Updates the plot with the current temperature profile and time."""
+        self.ax.clear()
+        contour = self.ax.contourf(self.GRID[0], self.GRID[1], self.b, cmap='hot')
+
+        # Reuse the colorbar axes instead of rebuilding the colorbar every redraw
+        if self.colorbar is None:
+            self.colorbar = self.fig.colorbar(contour, ax=self.ax, label="Temperature")
+        else:
+            self.colorbar.update_normal(contour)
+
+        self.ax.set_title(f"Temperature at t={time:.2f}")
+        self.ax.set_xlabel("X Position")
+        self.ax.set_ylabel("Y Position")
+        plt.draw()
+
+
+class HeatEqn3D(HeatEqnBase):
+    def __init__(self, k, rho, c_p, N, dt, t, length, T_i, **kwargs):
+        kwargs.setdefault("solver", "cg")
+        # The incomplete LU fills in badly on 3D grids, aggregation multigrid stays sparse
+        kwargs.setdefault("preconditioner", "amg")
+        super().__init__(k, rho, c_p, N, dt, t, length, T_i, **kwargs)
+        self.SPACE_STEP_X_1 = self.SPACING[0]
+        self.SPACE_STEP_X_2 = self.SPACING[1]
+        self.SPACE_STEP_X_3 = self.SPACING[2]
+        # Colorbar of every figure the slices were drawn on, reused on every redraw
+        self.colorbars = {}
+
+    def construct_grid(self):
+        x = np.linspace(0, self.LENGTH[0], self.SHAPE[0])
+        y = np.linspace(0, self.LENGTH[1], self.SHAPE[1])
+        z = np.linspace(0, self.LENGTH[2], self.SHAPE[2])
+        self.GRID = (x, y, z)
+        return self.GRID
+
+    def create_figure(self):
+        return plt.subplots(1, 3, figsize=(12, 4))
+
+    def draw_slices(self, fig, axes, time):
+        """
+        Draw the three orthogonal mid-plane slices of the temperature field.
+
+        :param fig      :   Figure to draw on
+        :param axes     :   Three axes, one per slice
+        :param time     :   Time shown in the title
+        :return         :   None
+        """
+        x, y, z = self.GRID
+        i, j, k = (n // 2 for n in self.SHAPE)
+        slices = [(self.b[i, :, :], z, y, "Z Position", "Y Position", f"x={x[i]:.2f}"),
+                  (self.b[:, j, :], z, x, "Z Position", "X Position", f"y={y[j]:.2f}"),
+                  (self.b[:, :, k], y, x, "Y Position", "X Position", f"z={z[k]:.2f}")]
+
+        vmin, vmax = np.min(self.b), np.max(self.b)
+        for ax, (field, h, v, xlabel, ylabel, title) in zip(axes, slices):
+            ax.clear()
+            image = ax.imshow(field, origin="lower", cmap="hot", vmin=vmin, vmax=vmax,
+                              extent=(h[0], h[-1], v[0], v[-1]), aspect="auto")
+            ax.set_title(title)
+            ax.set_xlabel(xlabel)
+            ax.set_ylabel(ylabel)
+
+        if fig not in self.colorbars:
+            self.colorbars[fig] = fig.colorbar(image, ax=list(axes), label="Temperature")
+        else:
+            self.colorbars[fig].update_normal(image)
+        fig.suptitle(f"Temperature at t={time:.2f}")
+
+    def update_plot(self, time):
+        """Updates the plot with the mid-plane slices of the temperature field."""
+        self.draw_slices(self.fig, self.ax, time)
+        plt.draw()
+
+    def save_plot(self, path):
+        """
+        Write the mid-plane slices to an image file without going through pyplot,
+        so it is safe to call from a headless run (e.g. as the solve callback).
+
+        :param path     :   Output file path
+        :return         :   None
+        """
+        if self.GRID is None:
+            self.construct_grid()
+        fig = Figure(figsize=(12, 4))
+        axes = fig.subplots(1, 3)
+        self.draw_slices(fig, axes, self.time)
+        fig.savefig(path)
+        self.colorbars.pop(fig, None)
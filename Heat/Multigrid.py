@@ -0,0 +1,293 @@
+import numpy as np
+from scipy.sparse import csr_matrix, diags
+from scipy.sparse.linalg import LinearOperator, splu
+
+from Heat import Operator_Assembly as oa
+from Heat.Smoother import BlockSmoother
+from Heat.Stencil import apply_stencil
+
+"""
+Geometric multigrid for the implicit heat system on structured grids,
+
+    shift * u - coeff * L u = f     on interior points
+                          u = f     on Dirichlet boundary points
+
+With shift = 1 and coeff = theta * dt * alpha this is the matrix A of
+Operator_Assembly.crank_nicolson, with shift = 0 it is the Poisson problem.
+
+Every level keeps the physical length of the domain. An axis of n points is
+coarsened to (n + 1) // 2 points. For odd n the coarse points are every other
+fine point, otherwise they are interpolated linearly. Only the axes with a
+spacing below twice the smallest one are coarsened (semicoarsening): on an
+anisotropic grid the coupling across the wide spacing is weak, point smoothing
+does not damp errors that are smooth along the strongly coupled axes only, and
+these have to be left to the coarser levels. Once the spacings are within a
+factor two of each other every axis is coarsened. Coarse operators are
+rediscretized, smoothing is red-black Gauss-Seidel, and the coarsest level is
+solved directly. With workers set, the levels with enough rows are smoothed
+by row blocks on a thread pool (Heat.Smoother).
+"""
+
+
+def interpolation_1d(n_fine, n_coarse):
+    """
+    Linear interpolation from n_coarse to n_fine equally spaced points on the
+    same interval.
+
+    :param n_fine   :   Number of fine points
+    :param n_coarse :   Number of coarse points
+    :return         :   Sparse (n_fine, n_coarse) matrix
+    """
+    x = np.linspace(0, n_coarse - 1, n_fine)
+    left = np.minimum(np.floor(x).astype(int), n_coarse - 2)
+    weight = x - left
+
+    rows = np.repeat(np.arange(n_fine), 2)
+    cols = np.column_stack([left, left + 1]).ravel()
+    vals = np.column_stack([1 - weight, weight]).ravel()
+    P = csr_matrix((vals, (rows, cols)), shape=(n_fine, n_coarse))
+    P.eliminate_zeros()
+    return P
+
+
+def apply_axis(M, u, axis):
+    """Apply the sparse matrix M along one axis of the array u."""
+    moved = np.moveaxis(u, axis, 0)
+    out = M @ moved.reshape(moved.shape[0], -1)
+    return np.moveaxis(out.reshape((M.shape[0],) + moved.shape[1:]), 0, axis)
+
+
+class _Level:
+    def __init__(self, shape, spacing, coeff, shift):
+        self.SHAPE = tuple(shape)
+        self.SPACING = list(spacing)
+        self.WEIGHTS = coeff / np.square(spacing)
+        self.DIAG = shift + 2.0 * np.sum(self.WEIGHTS)
+        self.COEFF = coeff
+        self.SHIFT = shift
+
+        self.INTERIOR = oa.interior_mask(self.SHAPE)
+        parity = np.add.reduce(np.indices(self.SHAPE), axis=0) % 2
+        self.COLORS = (self.INTERIOR & (parity == 0), self.INTERIOR & (parity == 1))
+
+        self.work = np.zeros(tuple(n - 2 for n in self.SHAPE))
+        self.buffer = np.zeros(self.SHAPE)
+        self.SMOOTHER = None
+
+        # Transfer operators to the next coarser level, one per axis
+        self.P = None
+        self.R = None
+        self.Q = None
+
+    def matrix(self):
+        """Assembled operator of the level, with identity Dirichlet rows."""
+        L = oa.laplacian(self.SHAPE, self.SPACING)
+        I = diags(np.where(self.INTERIOR.ravel(), self.SHIFT, 1.0))
+        return (I - self.COEFF * L).tocsc()
+
+
+class MultigridSolver:
+    CYCLES = ("V", "FMG")
+
+    def __init__(self, shape, spacing, coeff, shift=1.0, tol=1e-8, maxiter=50, cycle="V",
+                 pre_smooth=2, post_smooth=2, coarsest=5, workers=None):
+        """
+        Build the grid hierarchy.
+
+        :param shape        :   Number of points along each axis
+        :param spacing      :   Grid spacing along each axis
+        :param coeff        :   Coefficient of the Laplacian
+        :param shift        :   Coefficient of the identity
+        :param tol          :   Relative residual tolerance
+        :param maxiter      :   Maximum number of cycles
+        :param cycle        :   "V" for V-cycles, "FMG" for a full multigrid start
+        :param pre_smooth   :   Gauss-Seidel sweeps before the coarse correction
+        :param post_smooth  :   Gauss-Seidel sweeps after the coarse correction
+        :param coarsest     :   Stop coarsening an axis once it has fewer points
+        :param workers      :   Threads of the row-block smoother, None smooths serially
+        """
+        if cycle not in self.CYCLES:
+            raise ValueError(f"Unknown cycle '{cycle}', expected one of {self.CYCLES}.")
+
+        self.TOL = tol
+        self.MAXITER = maxiter
+        self.CYCLE = cycle
+        self.PRE_SMOOTH = pre_smooth
+        self.POST_SMOOTH = post_smooth
+        self.iterations = 0
+        self.residual = None
+
+        length = [h * (n - 1) for h, n in zip(spacing, shape)]
+        self.levels = [_Level(shape, spacing, coeff, shift)]
+        while True:
+            fine = self.levels[-1]
+            h_min = min(fine.SPACING)
+            coarsened = [n >= 2 * coarsest - 1 and h < 2.0 * h_min for n, h in zip(fine.SHAPE, fine.SPACING)]
+            if not any(coarsened):
+                break
+            coarse_shape = tuple((n + 1) // 2 if c else n for n, c in zip(fine.SHAPE, coarsened))
+            coarse_spacing = [l / (n - 1) for l, n in zip(length, coarse_shape)]
+
+            # Axes that are not coarsened have no transfer operator (the identity)
+            fine.P = [interpolation_1d(nf, nc) if c else None
+                      for nf, nc, c in zip(fine.SHAPE, coarse_shape, coarsened)]
+            # Full weighting: transpose of the interpolation with unit row sums
+            fine.R = [None if P is None else diags(1.0 / np.asarray(P.sum(axis=0)).ravel()) @ P.T.tocsr()
+                      for P in fine.P]
+            # Point sampling, used to carry Dirichlet values to the coarse grid
+            fine.Q = [interpolation_1d(nc, nf) if c else None
+                      for nf, nc, c in zip(fine.SHAPE, coarse_shape, coarsened)]
+
+            self.levels.append(_Level(coarse_shape, coarse_spacing, coeff, shift))
+
+        self._coarse_lu = splu(self.levels[-1].matrix())
+
+        if workers is not None:
+            for level in self.levels[:-1]:
+                smoother = BlockSmoother(level.SHAPE, level.SPACING, coeff, shift, workers=workers)
+                # Levels too small for more than one block keep the serial sweep
+                if smoother.executor is not None:
+                    level.SMOOTHER = smoother
+
+    @property
+    def num_levels(self):
+        return len(self.levels)
+
+    # ----------------------------- Grid Operations -------------------------------------------------
+
+    def residual_of(self, level, u, f, out):
+        """Residual f - A u of a level into out, zero on the boundary."""
+        apply_stencil(u, level.DIAG, -level.WEIGHTS, out, level.work)
+        np.subtract(f, out, out=out)
+        out[~level.INTERIOR] = 0.0
+        return out
+
+    def smooth(self, level, u, f, sweeps, reverse=False):
+        """
+        Red-black Gauss-Seidel sweeps in place. Reversing the colour order on the
+        post-smoothing keeps the V-cycle symmetric.
+        """
+        if level.SMOOTHER is not None:
+            return level.SMOOTHER.sweep(u, f, sweeps, reverse)
+
+        colors = level.COLORS[::-1] if reverse else level.COLORS
+        for _ in range(sweeps):
+            for color in colors:
+                # Sum of the neighbours, then the pointwise solve on one colour
+                apply_stencil(u, 0.0, level.WEIGHTS, level.buffer, level.work)
+                level.buffer += f
+                level.buffer *= 1.0 / level.DIAG
+                np.copyto(u, level.buffer, where=color)
+        return u
+
+    def restrict(self, level, r):
+        """Full weighting restriction of a fine grid array."""
+        for axis, R in enumerate(level.R):
+            if R is not None:
+                r = apply_axis(R, r, axis)
+        return r
+
+    def prolong(self, level, e):
+        """Linear interpolation of a coarse grid array."""
+        for axis, P in enumerate(level.P):
+            if P is not None:
+                e = apply_axis(P, e, axis)
+        return e
+
+    def sample(self, level, f):
+        """Sample a fine grid array at the coarse grid points."""
+        for axis, Q in enumerate(level.Q):
+            if Q is not None:
+                f = apply_axis(Q, f, axis)
+        return f
+
+    def coarse_solve(self, f):
+        level = self.levels[-1]
+        return self._coarse_lu.solve(f.ravel()).reshape(level.SHAPE)
+
+    # ----------------------------- Cycles ----------------------------------------------------------
+
+    def vcycle(self, index, u, f):
+        """One V-cycle on level index, updating u in place."""
+        if index == self.num_levels - 1:
+            u[...] = self.coarse_solve(f)
+            return u
+
+        level = self.levels[index]
+        self.smooth(level, u, f, self.PRE_SMOOTH)
+
+        r = self.residual_of(level, u, f, np.empty(level.SHAPE))
+        r_c = self.restrict(level, r)
+        r_c[~self.levels[index + 1].INTERIOR] = 0.0
+
+        e_c = np.zeros_like(r_c)
+        self.vcycle(index + 1, e_c, r_c)
+        u += self.prolong(level, e_c)
+
+        self.smooth(level, u, f, self.POST_SMOOTH, reverse=True)
+        return u
+
+    def fmg(self, f):
+        """Full multigrid: nested iteration from the coarsest level upwards."""
+        rhs = [f]
+        for index in range(self.num_levels - 1):
+            level, coarse = self.levels[index], self.levels[index + 1]
+            f_c = np.where(coarse.INTERIOR, self.restrict(level, rhs[-1]), self.sample(level, rhs[-1]))
+            rhs.append(f_c)
+
+        u = self.coarse_solve(rhs[-1])
+        for index in range(self.num_levels - 2, -1, -1):
+            u = self.prolong(self.levels[index], u)
+            u[~self.levels[index].INTERIOR] = rhs[index][~self.levels[index].INTERIOR]
+            self.vcycle(index, u, rhs[index])
+        return u
+
+    def solve(self, f, x0=None):
+        """
+        Solve the system on the finest grid.
+
+        :param f        :   Right hand side, flat or with the grid shape
+        :param x0       :   Initial guess, used for V-cycles
+        :return         :   Solution with the grid shape
+        """
+        level = self.levels[0]
+        f = np.reshape(f, level.SHAPE)
+        norm_f = np.linalg.norm(f[level.INTERIOR]) or 1.0
+
+        if self.CYCLE == "FMG":
+            u = self.fmg(f)
+        elif x0 is None:
+            u = np.zeros(level.SHAPE)
+        else:
+            u = np.array(np.reshape(x0, level.SHAPE), dtype=float)
+        u[~level.INTERIOR] = f[~level.INTERIOR]
+
+        r = np.empty(level.SHAPE)
+        self.iterations = 0
+        self.residual = np.linalg.norm(self.residual_of(level, u, f, r)) / norm_f
+        while self.residual > self.TOL and self.iterations < self.MAXITER:
+            self.vcycle(0, u, f)
+            self.iterations += 1
+            self.residual = np.linalg.norm(self.residual_of(level, u, f, r)) / norm_f
+
+        if self.residual > self.TOL:
+            raise RuntimeError(f"Multigrid did not converge in {self.MAXITER} cycles "
+                               f"(relative residual {self.residual:.3g}).")
+        return u
+
+    def preconditioner(self, index):
+        """
+        One symmetric V-cycle from a zero guess as a LinearOperator on the unknowns
+        at the flat positions index (e.g. the interior points for CG).
+        """
+        level = self.levels[0]
+
+        def apply(r):
+            f = np.zeros(level.SHAPE)
+            f.ravel()[index] = r
+            u = np.zeros(level.SHAPE)
+            self.vcycle(0, u, f)
+            return u.ravel()[index]
+
+        n = len(index)
+        return LinearOperator((n, n), apply)
@@ -0,0 +1,89 @@
+import numpy as np
+from scipy.sparse import diags, identity, kron
+
+"""
+Finite difference operator assembly on structured grids.
+
+The N-dimensional Laplacian is built as the Kronecker sum of 1D second
+difference operators, so every axis has its own number of points and spacing.
+Fields are flattened in C order with 'ij' indexing, which matches
+np.meshgrid(..., indexing='ij') followed by ravel().
+
+Boundary rows are Dirichlet: their rows are zeroed in the Laplacian so that the
+time stepping matrices hold the boundary values fixed.
+"""
+
+
+def laplacian_1d(n, h):
+    """
+    Second difference operator on n points with spacing h.
+
+    :param n    :   Number of grid points
+    :param h    :   Grid spacing
+    :return     :   Sparse (n, n) matrix
+    """
+    main = np.full(n, -2.0 / np.square(h))
+    off = np.full(n - 1, 1.0 / np.square(h))
+    return diags([main, off, off], offsets=[0, -1, 1], format='csr')
+
+
+def interior_mask(shape):
+    """
+    Boolean mask that is True on interior points of a structured grid.
+
+    :param shape    :   Number of points along each axis
+    :return         :   Boolean array of the given shape
+    """
+    mask = np.zeros(shape, dtype=bool)
+    mask[(slice(1, -1),) * len(shape)] = True
+    return mask
+
+
+def laplacian(shape, spacing):
+    """
+    Laplacian on a structured grid as a Kronecker sum of 1D operators,
+    L = sum_d I x ... x L_d x ... x I, with the boundary rows zeroed.
+
+    :param shape    :   Number of points along each axis (Nx, Ny, Nz ...)
+    :param spacing  :   Grid spacing along each axis
+    :return         :   Sparse CSR matrix of size prod(shape)
+    """
+    shape = tuple(int(n) for n in shape)
+    if len(shape) != len(spacing):
+        raise ValueError("shape and spacing must have the same length.")
+
+    L = None
+    for axis, (n, h) in enumerate(zip(shape, spacing)):
+        term = laplacian_1d(n, h)
+        left = int(np.prod(shape[:axis]))
+        right = int(np.prod(shape[axis + 1:]))
+        if right > 1:
+            term = kron(term, identity(right, format='csr'), format='csr')
+        if left > 1:
+            term = kron(identity(left, format='csr'), term, format='csr')
+        L = term if L is None else L + term
+
+    # Dirichlet rows: scale every boundary row by zero
+    L = diags(interior_mask(shape).ravel().astype(float)) @ L
+    L.eliminate_zeros()
+    return L.tocsr()
+
+
+def crank_nicolson(shape, spacing, alpha, dt, theta=0.5):
+    """
+    Implicit and explicit matrices of the theta scheme
+    (I - theta dt alpha L) T^{n+1} = (I + (1 - theta) dt alpha L) T^n.
+    theta = 0.5 is Crank-Nicolson. Boundary rows are identity rows.
+
+    :param shape    :   Number of points along each axis
+    :param spacing  :   Grid spacing along each axis
+    :param alpha    :   Thermal diffusivity
+    :param dt       :   Time step
+    :param theta    :   Implicitness of the scheme
+    :return         :   (A, Ac) as sparse CSC matrices
+    """
+    L = laplacian(shape, spacing)
+    I = identity(L.shape[0], format='csc')
+    A = (I - (theta * dt * alpha) * L).tocsc()
+    Ac = (I + ((1 - theta) * dt * alpha) * L).tocsc()
+    return A, Ac
@@ -0,0 +1,193 @@
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+
+"""
+Streaming snapshot store for simulation time histories.
+
+A run is a directory of fixed size chunk files, chunk_00000.npy, chunk_00001.npy
+..., each a memory mapped .npy array of shape (chunk, *field_shape), plus an
+index.json with the field shape, the chunk size and the time of every stored
+snapshot. Fields are written from a background thread, and reading maps only
+the chunks that a time slice touches.
+"""
+
+INDEX = "index.json"
+
+
+def _chunk_path(path, chunk_idx):
+    return os.path.join(path, f"chunk_{chunk_idx:05d}.npy")
+
+
+class SnapshotWriter:
+    def __init__(self, path, shape, chunk=64, dtype=np.float64, queue_size=8):
+        """
+        Open a snapshot store for writing. Use it as the callback of
+        HeatEqnBase.solve, where every_n / every_t set the output interval.
+
+        :param path         :   Directory of the store, created if needed
+        :param shape        :   Shape of a single field
+        :param chunk        :   Number of snapshots per chunk file
+        :param dtype        :   Data type stored on disk
+        :param queue_size   :   Snapshots buffered in memory before put() blocks
+        """
+        os.makedirs(path, exist_ok=True)
+        self.PATH = path
+        self.SHAPE = tuple(shape)
+        self.CHUNK = chunk
+        self.DTYPE = np.dtype(dtype)
+
+        self.times = []
+        self._chunk = None
+        self._error = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def __call__(self, heat_eqn):
+        self.put(heat_eqn.b, heat_eqn.time)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def put(self, field, time):
+        """
+        Queue a field for writing. The field is copied, so the solver may keep
+        updating its buffers.
+
+        :param field    :   Field of the store's shape
+        :param time     :   Simulation time of the field
+        :return         :   None
+        """
+        self._raise_error()
+        if np.shape(field) != self.SHAPE:
+            raise ValueError(f"Field of shape {np.shape(field)} does not match store {self.SHAPE}.")
+        self._enqueue((np.array(field, dtype=self.DTYPE), float(time)))
+
+    def close(self):
+        """Write the queued snapshots, flush the last chunk and the index."""
+        if self._thread.is_alive():
+            self._enqueue(None)
+            self._thread.join()
+        self._raise_error()
+
+    def _enqueue(self, item, poll=0.1):
+        """
+        Put an item on the full queue without blocking forever, the writer
+        thread may die while the queue is full.
+        """
+        while True:
+            try:
+                self._queue.put(item, timeout=poll)
+                return
+            except queue.Full:
+                self._raise_error()
+                if not self._thread.is_alive():
+                    raise RuntimeError("Snapshot writer thread stopped.")
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError("Snapshot writer failed.") from self._error
+
+    def _drain(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                self._write(*item)
+        except Exception as error:
+            self._error = error
+        finally:
+            if self._chunk is not None:
+                self._chunk.flush()
+                self._chunk = None
+            self._write_index()
+
+    def _write(self, field, time):
+        count = len(self.times)
+        chunk_idx, offset = divmod(count, self.CHUNK)
+        if offset == 0:
+            if self._chunk is not None:
+                self._chunk.flush()
+                self._write_index()
+            self._chunk = np.lib.format.open_memmap(_chunk_path(self.PATH, chunk_idx), mode="w+",
+                                                    dtype=self.DTYPE, shape=(self.CHUNK,) + self.SHAPE)
+        self._chunk[offset] = field
+        self.times.append(time)
+
+    def _write_index(self):
+        index = {"shape": list(self.SHAPE), "chunk": self.CHUNK,
+                 "dtype": self.DTYPE.str, "times": self.times}
+        tmp = os.path.join(self.PATH, INDEX + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp, os.path.join(self.PATH, INDEX))
+
+
+class SnapshotReader:
+    def __init__(self, path):
+        """
+        Open a snapshot store for lazy reading.
+
+        :param path     :   Directory written by SnapshotWriter
+        """
+        with open(os.path.join(path, INDEX)) as f:
+            index = json.load(f)
+
+        self.PATH = path
+        self.SHAPE = tuple(index["shape"])
+        self.CHUNK = index["chunk"]
+        self.DTYPE = np.dtype(index["dtype"])
+        self.times = np.asarray(index["times"])
+        self._chunks = {}
+
+    def __len__(self):
+        return len(self.times)
+
+    def _chunk(self, chunk_idx):
+        if chunk_idx not in self._chunks:
+            self._chunks[chunk_idx] = np.load(_chunk_path(self.PATH, chunk_idx), mmap_mode="r")
+        return self._chunks[chunk_idx]
+
+    def __getitem__(self, idx):
+        """
+        Snapshot idx as a read-only memory mapped view, or a stacked array for a
+        slice of snapshots.
+        """
+        if isinstance(idx, slice):
+            indices = range(*idx.indices(len(self)))
+            if len(indices) == 0:
+                return np.empty((0,) + self.SHAPE, dtype=self.DTYPE)
+            return np.stack([self[i] for i in indices])
+
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(f"Snapshot {idx} out of range for {len(self)} snapshots.")
+        chunk_idx, offset = divmod(idx, self.CHUNK)
+        return self._chunk(chunk_idx)[offset]
+
+    def index_at(self, time):
+        """Index of the last snapshot written at or before time."""
+        return max(int(np.searchsorted(self.times, time, side="right")) - 1, 0)
+
+    def at_time(self, time):
+        """Snapshot at or right before the given time."""
+        return self[self.index_at(time)]
+
+    def between(self, t_start, t_end):
+        """
+        Snapshots with t_start <= time <= t_end.
+
+        :return     :   (times, fields) with fields stacked along the first axis
+        """
+        lo = int(np.searchsorted(self.times, t_start, side="left"))
+        hi = int(np.searchsorted(self.times, t_end, side="right"))
+        return self.times[lo:hi], self[lo:hi]
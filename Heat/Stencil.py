@@ -0,0 +1,119 @@
+import numpy as np
+
+"""
+Matrix-free finite difference stencils on structured grids.
+
+The Laplacian is applied directly to the N-dimensional field with array slicing,
+so no sparse matrix or flattened copy of the field is built per step. Boundary
+points are Dirichlet and are left untouched, matching Operator_Assembly.
+"""
+
+
+def max_stable_dt(spacing, alpha):
+    """
+    Largest stable time step of the explicit (FTCS) scheme,
+    dt <= 1 / (2 alpha sum_d 1 / h_d^2).
+
+    :param spacing  :   Grid spacing along each axis
+    :param alpha    :   Thermal diffusivity
+    :return         :   Maximum stable time step
+    """
+    return 1.0 / (2.0 * alpha * np.sum(1.0 / np.square(spacing)))
+
+
+def apply_stencil(u, center, weights, out, work, boundary=0.0):
+    """
+    Evaluate center * u + sum_d weights[d] * (u[i - 1] + u[i + 1]) on the interior
+    of the grid. Boundary entries of out are set to boundary * u. The grid axes
+    are the last len(weights) axes of u, any leading axes are a batch of fields.
+
+    :param u        :   Field on the grid
+    :param center   :   Weight of the centre point
+    :param weights  :   Weight of the two neighbours along each axis
+    :param out      :   Output array with the shape of u
+    :param work     :   Scratch array with the shape of the interior of u
+    :param boundary :   Factor applied to the boundary values
+    :return         :   out
+    """
+    ndim = len(weights)
+    batch = (slice(None),) * (u.ndim - ndim)
+    inner = batch + (slice(1, -1),) * ndim
+    if boundary == 0.0:
+        out.fill(0.0)
+    else:
+        np.multiply(u, boundary, out=out)
+
+    out_inner = out[inner]
+    np.multiply(u[inner], center, out=out_inner)
+    for axis, weight in enumerate(weights, start=len(batch)):
+        lower = inner[:axis] + (slice(0, -2),) + inner[axis + 1:]
+        upper = inner[:axis] + (slice(2, None),) + inner[axis + 1:]
+        np.add(u[lower], u[upper], out=work)
+        work *= weight
+        out_inner += work
+
+    return out
+
+
+def apply_laplacian(u, spacing, out, work):
+    """
+    Evaluate the Laplacian of u into out. Boundary entries of out are set to zero.
+
+    :param u        :   Field on the grid
+    :param spacing  :   Grid spacing along each axis
+    :param out      :   Output array with the shape of u
+    :param work     :   Scratch array with the shape of the interior of u
+    :return         :   out
+    """
+    weights = 1.0 / np.square(spacing)
+    return apply_stencil(u, -2.0 * np.sum(weights), weights, out, work)
+
+
+class StencilStepper:
+    def __init__(self, shape, spacing, alpha, dt, batch=None):
+        """
+        Matrix-free time stepping with preallocated buffers.
+
+        :param shape    :   Number of points along each axis
+        :param spacing  :   Grid spacing along each axis
+        :param alpha    :   Thermal diffusivity
+        :param dt       :   Time step
+        :param batch    :   Number of fields advanced together, None for one field
+        """
+        self.SHAPE = tuple(shape)
+        self.SPACING = list(spacing)
+        self.ALPHA = alpha
+        self.TIME_STEP = dt
+
+        lead = () if batch is None else (batch,)
+        self._work = np.zeros(lead + tuple(n - 2 for n in self.SHAPE))
+        self._buffers = [np.zeros(lead + self.SHAPE), np.zeros(lead + self.SHAPE)]
+
+    def check_stability(self):
+        """Raise if the time step violates the CFL limit of the explicit scheme."""
+        limit = max_stable_dt(self.SPACING, self.ALPHA)
+        if self.TIME_STEP > limit:
+            raise ValueError(f"Time step {self.TIME_STEP} exceeds the explicit stability "
+                             f"limit {limit:.4g} (CFL condition).")
+
+    def _next_buffer(self, u):
+        return self._buffers[1] if u is self._buffers[0] else self._buffers[0]
+
+    def rhs(self, u, theta=0.5):
+        """
+        Right hand side of the theta scheme, u + (1 - theta) dt alpha L u.
+
+        The result lives in an internal buffer that is reused on the next call.
+        """
+        weights = (1 - theta) * self.TIME_STEP * self.ALPHA / np.square(self.SPACING)
+        return apply_stencil(u, 1.0 - 2.0 * np.sum(weights), weights,
+                             self._next_buffer(u), self._work, boundary=1.0)
+
+    def explicit_step(self, u):
+        """
+        One forward Euler (FTCS) step, u + dt alpha L u.
+
+        The two internal buffers are used alternately, so the returned array is
+        overwritten two steps later.
+        """
+        return self.rhs(u, theta=0.0)
@@ -0,0 +1,108 @@
+import itertools
+import time
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+"""
+Parameter sweeps over the heat solvers on a process pool.
+
+Every run writes its final field straight into one shared memory block that
+is allocated up front, one slot per run, so only a few scalars per run are
+pickled back to the parent process.
+"""
+
+_worker = {}
+
+
+def _init_worker(shm_name, shape, model, N, t, length, T_i, options):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker.update(shm=shm, out=np.ndarray(shape, dtype=np.float64, buffer=shm.buf),
+                   model=model, N=N, t=t, length=length, T_i=T_i, options=options)
+
+
+def _run(task):
+    idx, (k, rho, c_p, dt) = task
+    start = time.perf_counter()
+
+    heat_eqn = _worker["model"](k, rho, c_p, _worker["N"], dt, _worker["t"], _worker["length"],
+                                np.array(_worker["T_i"], dtype=float), **_worker["options"])
+    field = heat_eqn.solve(headless=True)
+    _worker["out"][idx] = field
+
+    return {"index": idx, "k": k, "rho": rho, "c_p": c_p, "dt": dt,
+            "steps": heat_eqn.steps, "time": heat_eqn.time,
+            "max": float(np.max(field)), "min": float(np.min(field)),
+            "wall": time.perf_counter() - start}
+
+
+class SweepResult:
+    def __init__(self, params, fields, stats):
+        """
+        Outcome of a parameter sweep.
+
+        :param params   :   (k, rho, c_p, dt) of every run, in slot order
+        :param fields   :   Final fields, fields[i] belongs to params[i]
+        :param stats    :   Per run summary returned by the workers, in slot order
+        """
+        self.params = params
+        self.fields = fields
+        self.stats = stats
+
+    def __len__(self):
+        return len(self.params)
+
+    def __getitem__(self, idx):
+        return self.params[idx], self.fields[idx]
+
+
+def parameter_grid(k, rho, c_p, dt):
+    """
+    Cartesian product of the material parameters and time steps.
+
+    :return     :   List of (k, rho, c_p, dt) tuples
+    """
+    def as_list(value):
+        return list(value) if hasattr(value, "__iter__") else [value]
+
+    return list(itertools.product(as_list(k), as_list(rho), as_list(c_p), as_list(dt)))
+
+
+def run_sweep(model, k, rho, c_p, dt, N, t, length, T_i, processes=None, progress=None, **options):
+    """
+    Run model for every combination of k, rho, c_p and dt in a process pool.
+
+    :param model        :   Solver class, e.g. HeatEqn1D or HeatEqn2D
+    :param k            :   Thermal conductivity, a value or a sequence
+    :param rho          :   Density, a value or a sequence
+    :param c_p          :   Specific heat, a value or a sequence
+    :param dt           :   Time step, a value or a sequence
+    :param N            :   Grid size shared by all runs
+    :param t            :   Final time shared by all runs
+    :param length       :   Domain length shared by all runs
+    :param T_i          :   Initial field shared by all runs
+    :param processes    :   Number of worker processes, defaults to the CPU count
+    :param progress     :   Called as progress(done, total, stats) after each run
+    :param options      :   Extra keyword arguments of the solver (solver, scheme ...)
+    :return             :   SweepResult
+    """
+    params = parameter_grid(k, rho, c_p, dt)
+    T_i = np.asarray(T_i, dtype=float)
+    shape = (len(params),) + T_i.shape
+
+    shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * 8, 1))
+    try:
+        stats = [None] * len(params)
+        with Pool(processes, initializer=_init_worker,
+                  initargs=(shm.name, shape, model, N, t, length, T_i, options)) as pool:
+            for done, result in enumerate(pool.imap_unordered(_run, enumerate(params)), start=1):
+                stats[result["index"]] = result
+                if progress is not None:
+                    progress(done, len(params), result)
+
+        fields = np.ndarray(shape, dtype=np.float64, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return SweepResult(params, fields, stats)
@@ -0,0 +1,253 @@
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.collections import PolyCollection
+from scipy.sparse import diags
+
+from FVM.MeshStructure.array_mesh import CELL_TYPES, ArrayMesh
+from FVM.MeshStructure.fv_mesh import FVMesh
+from FVM.Solver import krylov
+from FVM.Solver.laplacian import diffusion_operator, factorize_spd
+from Heat.Heat_Equation import HeatEqnBase
+
+"""
+Heat equation on an unstructured finite volume mesh
+
+    V dT/dt = -alpha K T + boundary source + non-orthogonal correction
+
+with K the cell centred diffusion operator of FVM.Solver.laplacian. Boundary
+conditions are given per named group of boundary faces (the gmsh physical
+groups of Mesh2D.getBoundaryGroups):
+
+    {"hot": ("dirichlet", 100.0), "heater": ("neumann", 5e3)}
+
+Dirichlet sets the temperature on the faces, Neumann the inward heat flux
+q = k dT/dn. Boundary faces outside every listed group are insulated.
+
+The implicit matrix (V / dt + alpha K / 2 for Crank-Nicolson, V / dt + alpha K
+for backward Euler) only depends on the mesh and the time step, so it is
+assembled and factorized once like the structured solvers and every step is
+one sparse product and a pair of triangular solves per correction sweep. The
+non-orthogonal correction is deferred: lagged to the previous step and then
+refined by the sweeps. It vanishes on orthogonal meshes.
+"""
+
+BOUNDARY_KINDS = ("dirichlet", "neumann")
+
+
+class HeatEqnFVM(HeatEqnBase):
+    SOLVERS = ("factorized", "spsolve", "cg", "bicgstab", "gmres")
+    PRECONDITIONERS = ("ilu", "jacobi", "amg", None)
+    SCHEMES = ("crank-nicolson", "backward-euler")
+    BACKENDS = ("sparse",)
+
+    def __init__(self, k, rho, c_p, mesh, dt, t, T_i, boundaries=None, groups=None, solver="factorized",
+                 scheme="crank-nicolson", preconditioner="amg", tol=1e-8, corrections=None):
+        """
+        :param k                :   Conductivity, scalar or (n_cells,)
+        :param rho              :   Density
+        :param c_p              :   Specific heat capacity
+        :param mesh             :   FVMesh (or ArrayMesh)
+        :param dt               :   Time step
+        :param t                :   End time
+        :param T_i              :   Initial temperature, scalar or (n_cells,)
+        :param boundaries       :   Dict of group name -> (kind, value), value a scalar
+                                    or one value per face of the group
+        :param groups           :   Dict of group name -> boundary face indices
+        :param solver           :   "factorized", "spsolve" or a Krylov method ("cg",
+                                    "bicgstab", "gmres") for meshes too large to factorize
+        :param scheme           :   "crank-nicolson" or "backward-euler"
+        :param preconditioner   :   Preconditioner of the Krylov methods
+        :param tol              :   Solver tolerance
+        :param corrections      :   Non-orthogonal correction sweeps (solves) per step,
+                                    0 turns the correction off. Defaults to 2 for
+                                    Crank-Nicolson, 1 (lagged) for backward Euler
+        """
+        self.mesh = mesh if isinstance(mesh, FVMesh) else FVMesh(mesh)
+        n_cells = self.mesh.n_cells
+        T_i = np.array(np.broadcast_to(np.asarray(T_i, dtype=float), (n_cells,)))
+
+        # The cells are the only axis of the field, the geometry lives in the mesh
+        super().__init__(k, rho, c_p, (n_cells,), dt, t, 1.0, T_i, solver=solver, scheme=scheme,
+                         preconditioner=preconditioner, tol=tol)
+        self.DIM = 2
+        self.LENGTH = list(np.ptp(self.mesh.coords, axis=0))
+        self.SPACING = None
+        if corrections is None:
+            corrections = 2 if scheme == "crank-nicolson" else 1
+        self.PARAMS.update({"N": n_cells, "length": self.LENGTH, "corrections": corrections})
+        # Options of the structured grids only
+        for key in ("backend", "workers"):
+            del self.PARAMS[key]
+
+        self.CORRECTIONS = corrections
+        self.BOUNDARIES = {} if boundaries is None else dict(boundaries)
+        self.GROUPS = {} if groups is None else {name: np.asarray(faces, dtype=np.int32)
+                                                 for name, faces in groups.items()}
+        self.OPERATOR = None
+        self.SOURCE = None
+        self._dirichlet_values = None
+        self._polygons = None
+        self.colorbar = None
+
+        self._set_boundaries()
+        self.PARAMS.update({"boundaries": self.BOUNDARIES, "groups": self.GROUPS})
+
+    @classmethod
+    def from_checkpoint(cls, params, field, arrays):
+        """Rebuild the solver on the mesh stored by checkpoint_arrays."""
+        node_types = {n: elem_type for elem_type, n in CELL_TYPES.items()}
+        offsets = arrays["cell_offsets"]
+        types = np.array([node_types[n] for n in np.diff(offsets)], dtype=np.int8)
+        mesh = ArrayMesh(arrays["nodes"], np.arange(len(arrays["nodes"])) + 1, offsets, arrays["cell_nodes"],
+                         types, np.arange(len(types)) + 1)
+
+        k = params.pop("k")
+        args = [np.asarray(k) if isinstance(k, list) else k] + [params.pop(key) for key in ("rho", "c_p")]
+        dt, t = params.pop("dt"), params.pop("t")
+        for key in ("N", "length"):
+            del params[key]
+        boundaries = {name: tuple(condition) for name, condition in params.pop("boundaries").items()}
+        return cls(*args, mesh, dt, t, field, boundaries=boundaries, groups=params.pop("groups"), **params)
+
+    def checkpoint_arrays(self):
+        """The cells of the mesh, the faces are rebuilt from them in the same order."""
+        return {"nodes": self.mesh.coords, "cell_offsets": self.mesh.cell_offsets,
+                "cell_nodes": self.mesh.cell_nodes}
+
+    def _set_boundaries(self):
+        """Dirichlet faces and values, and the Neumann fluxes on every face."""
+        mesh = self.mesh
+        boundary = np.zeros(mesh.n_faces, dtype=bool)
+        boundary[mesh.boundary_faces] = True
+
+        dirichlet, values = [], []
+        fluxes = np.zeros(mesh.n_faces)
+        for name, (kind, value) in self.BOUNDARIES.items():
+            if name not in self.GROUPS:
+                raise ValueError(f"Unknown boundary group '{name}', expected one of {tuple(self.GROUPS)}.")
+            if kind not in BOUNDARY_KINDS:
+                raise ValueError(f"Unknown boundary condition '{kind}', expected one of {BOUNDARY_KINDS}.")
+            faces = self.GROUPS[name]
+            if not np.all(boundary[faces]):
+                raise ValueError(f"Boundary group '{name}' contains interior faces.")
+
+            value = np.broadcast_to(np.asarray(value, dtype=float), faces.shape)
+            if kind == "dirichlet":
+                dirichlet.append(faces)
+                values.append(value)
+            else:
+                fluxes[faces] = value
+
+        self.DIRICHLET = np.concatenate(dirichlet) if dirichlet else np.zeros(0, dtype=np.int32)
+        if len(np.unique(self.DIRICHLET)) != len(self.DIRICHLET):
+            raise ValueError("A face belongs to more than one Dirichlet group.")
+        self._dirichlet_face_values = np.concatenate(values) if values else np.zeros(0)
+        self.FLUXES = fluxes
+
+    def construct_grid(self):
+        mesh = self.mesh
+        self.GRID = mesh.centroids
+        self._polygons = [mesh.coords[mesh.cell_nodes[start:stop]]
+                          for start, stop in zip(mesh.cell_offsets[:-1], mesh.cell_offsets[1:])]
+        return self.GRID
+
+    def build_matrix(self):
+        """
+        Assemble the implicit and explicit matrices of the scheme and the
+        constant boundary source, from the shared diffusion operator of the
+        mesh and its Dirichlet faces.
+        """
+        if self.OPERATOR is None:
+            self.OPERATOR = diffusion_operator(self.mesh, self.DIRICHLET)
+            # The cached operator may list the Dirichlet faces in another order
+            order = np.argsort(self.DIRICHLET, kind="stable")
+            faces = self.DIRICHLET[order]
+            values = self._dirichlet_face_values[order]
+            position = np.searchsorted(faces, self.OPERATOR.dirichlet)
+            self._dirichlet_values = values[position] if len(faces) else values
+
+            rho_c_p = self.PARAMS["rho"] * self.PARAMS["c_p"]
+            self.SOURCE = self.OPERATOR.boundary_source(self.ALPHA, self._dirichlet_values,
+                                                        self.FLUXES / rho_c_p)
+
+        # Matrices restored from a checkpoint are kept as they are
+        if self.A is None:
+            K = self.OPERATOR.matrix(self.ALPHA)
+            mass = diags(self.mesh.volumes / self.TIME_STEP)
+            theta = 0.5 if self.SCHEME == "crank-nicolson" else 1.0
+            self.A = (mass + theta * K).tocsc()
+            self.Ac = (mass - (1 - theta) * K).tocsr()
+
+    def factorize(self):
+        """
+        Factorize the symmetric positive definite implicit matrix once, or set up
+        the Krylov solver and its preconditioner once.
+        """
+        if self.A is None:
+            return
+        if self.SOLVER == "factorized":
+            self.LU = factorize_spd(self.A)
+        elif self.SOLVER in krylov.METHODS:
+            self.KRYLOV = krylov.KrylovSolver(self.A, self.SOLVER, self.PRECONDITIONER, tol=self.TOL)
+
+    def _krylov_solve(self, rhs):
+        """Krylov solve of the whole system, warm started from the previous solution."""
+        x = self.KRYLOV.solve(rhs)
+        self.iterations = self.KRYLOV.iterations
+        self.residual = self.KRYLOV.residual
+        return x
+
+    def advance(self, T, solve):
+        """
+        One step from the field T, (n_cells,) or (n_cells, M). The correction is
+        split like the operator, the implicit share is iterated with the sweeps
+        (lagged to T in the first one), and the converged sweeps are the scheme
+        applied to the full corrected operator.
+
+        :param T        :   Field(s) at the start of the step
+        :param solve    :   Solver of A x = rhs for the shape of T
+        :return         :   Field(s) at the end of the step
+        """
+        rhs = self.Ac.dot(T) + (self.SOURCE if T.ndim == 1 else self.SOURCE[:, None])
+        if not self.CORRECTIONS:
+            return solve(rhs)
+
+        theta = 0.5 if self.SCHEME == "crank-nicolson" else 1.0
+        operator, values = self.OPERATOR, self._dirichlet_values
+        explicit = operator.correction(T, self.ALPHA, values)
+        T_new = solve(rhs + explicit)
+        for _ in range(self.CORRECTIONS - 1):
+            T_new = solve(rhs + (1 - theta) * explicit + theta * operator.correction(T_new, self.ALPHA, values))
+        return T_new
+
+    def step(self):
+        """Advance the temperature field by one time step."""
+        self.b = self.advance(self.b, self.linear_solve)
+
+    def step_ensemble(self, fields, stencil=None):
+        """Advance a stack of fields of shape (M, n_cells) by one time step."""
+        if self.SOLVER == "factorized":
+            return self.advance(fields.T, lambda rhs: self.LU.solve(np.asfortranarray(rhs))).T
+
+        def solve(rhs):
+            return np.column_stack([self.linear_solve(rhs[:, m]) for m in range(rhs.shape[1])])
+        return self.advance(fields.T, solve).T
+
+    def update_plot(self, time):
+        """Updates the plot with the current temperature of every cell and time."""
+        self.ax.clear()
+        cells = PolyCollection(self._polygons, array=self.b, cmap='hot', edgecolors='face')
+        self.ax.add_collection(cells)
+        self.ax.autoscale_view()
+        self.ax.set_aspect('equal')
+
+        # Reuse the colorbar axes instead of rebuilding the colorbar every redraw
+        if self.colorbar is None:
+            self.colorbar = self.fig.colorbar(cells, ax=self.ax, label="Temperature")
+        else:
+            self.colorbar.update_normal(cells)
+
+        self.ax.set_title(f"Temperature at t={time:.2f}")
+        self.ax.set_xlabel("X Position")
+        self.ax.set_ylabel("Y Position")
+        plt.draw()
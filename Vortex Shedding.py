@@ -9,22 +9,20 @@ domain.generateMesh()
 # domain.refineMesh(iter=1)
 domain.showMesh()
 
-# Pt Tag    flattened (x1,y1,z1, x2,y2,z2 ...)
-# node_tags, node_coords, _ = domain.getNodes()
-# nodes = node_coords.reshape(-1, 3)[:, :2]
+# Array representation of the mesh, cached until the next generate / refine
+# mesh = domain.getMesh()
+# nodes = mesh.nodes                          # (n_nodes, 2) x, y coordinates
 
-# # Shape Type    Id for shape   Node tag belong
-# # 2 = Tri                       to each shape
-# # 3 = Quadril
-# elem_types, elem_tags, elem_node_tags = domain.getElements()
-# for elem_type, elem_node_tag in zip(elem_types, elem_node_tags):
-#     if elem_type == 2:  # 3-node triangles
-#         num_nodes_per_elem = 3
-#     elif elem_type == 3:  # 4-node quadrilaterals
-#         num_nodes_per_elem = 4
-#     else:
-#         continue  # Skip unsupported element types
-    
-#     print(len(elem_node_tag))
-#     elements = np.array(elem_node_tag).reshape(-1, num_nodes_per_elem) - 1
-#     # print(elements)
+# # Shape Type  First cell  Node indices of each cell
+# # 2 = Tri                 (M, 3) for triangles
+# # 3 = Quadril             (M, 4) for quadrilaterals
+# for elem_type, first_cell, cells in mesh.blocks():
+#     print(elem_type, first_cell, cells.shape)
+
+# # Cylinder wake at Re = U D / nu = 100, run headless
+# from FVM.Solver.incompressible import IncompressibleFlow
+# flow = IncompressibleFlow(domain.getFVMesh(), nu=0.02, dt=1.0)   # inlet left, outlet right
+# flow.set_time_step(flow.max_stable_dt(cfl=0.4, velocity=2.0))
+# flow.add_probe(x=-4.0, y=0.0)                                    # 1.5 D behind the cylinder
+# flow.solve(t=150, every_t=10, callback=lambda f: print(f"t = {f.time:.0f}"))
+# print("St =", flow.strouhal(diameter=2.0))
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from FVM.MeshStructure.array_mesh import ArrayMesh  # noqa: E402
+
+
+def grid_mesh(nx, ny, lx=1.0, ly=1.0, jitter=0.0, seed=0):
+    """
+    Rectangle split into nx * ny cells, triangles on the left half and quads on
+    the right half, with the inner nodes moved randomly by jitter cell sizes.
+    """
+    x, y = np.meshgrid(np.linspace(0, lx, nx + 1), np.linspace(0, ly, ny + 1), indexing="ij")
+    nodes = np.column_stack([x.ravel(), y.ravel()])
+    if jitter:
+        inner = (x.ravel() > 0) & (x.ravel() < lx) & (y.ravel() > 0) & (y.ravel() < ly)
+        h = min(lx / nx, ly / ny)
+        nodes[inner] += np.random.default_rng(seed).uniform(-jitter, jitter, (inner.sum(), 2)) * h
+
+    idx = np.arange(len(nodes)).reshape(nx + 1, ny + 1)
+    a, b, c, d = idx[:-1, :-1], idx[1:, :-1], idx[1:, 1:], idx[:-1, 1:]
+    half = nx // 2
+    tris = np.concatenate([np.stack([a[:half], b[:half], c[:half]], -1).reshape(-1, 3),
+                           np.stack([a[:half], c[:half], d[:half]], -1).reshape(-1, 3)])
+    quads = np.stack([a[half:], b[half:], c[half:], d[half:]], -1).reshape(-1, 4)
+
+    tags = np.arange(len(nodes)) + 1
+    return ArrayMesh.from_gmsh(tags, np.column_stack([nodes, np.zeros(len(nodes))]).ravel(), [2, 3],
+                               [np.arange(len(tris)) + 1, np.arange(len(quads)) + 1 + len(tris)],
+                               [tags[tris].ravel(), tags[quads].ravel()])
+
+
+@pytest.fixture
+def mesh_factory():
+    return grid_mesh
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from Heat.Heat_Equation import HeatEqn1D
+from Heat.Stencil import max_stable_dt
+
+
+@pytest.mark.parametrize("scheme, dt", [("crank-nicolson", 1e-3), ("explicit", 1e-2)])
+def test_adaptive_run_follows_the_exact_decay(scheme, dt):
+    x = np.linspace(0.0, 1.0, 21)
+    heat_eqn = HeatEqn1D(1.0, 1.0, 1.0, 21, dt, 0.05, 1.0, np.sin(np.pi * x), scheme=scheme)
+    T = heat_eqn.solve_adaptive(tol=1e-3, headless=True)
+
+    np.testing.assert_allclose(T, np.exp(-np.pi ** 2 * heat_eqn.time) * np.sin(np.pi * x), atol=2e-3)
+    assert np.isclose(heat_eqn.time, 0.05)
+    if scheme == "explicit":
+        # An unstable time step is not restored at the end of the run
+        assert heat_eqn.TIME_STEP <= max_stable_dt(heat_eqn.SPACING, heat_eqn.ALPHA)
+
+
+def test_steady_exit_and_cached_steps():
+    x = np.linspace(0.0, 1.0, 51)
+    heat_eqn = HeatEqn1D(1.0, 1.0, 1.0, 51, 1e-3, 2.0, 1.0, np.sin(np.pi * x))
+    heat_eqn.solve_adaptive(tol=1e-4, steady_tol=1e-3, headless=True)
+
+    assert heat_eqn.steady and heat_eqn.time < 2.0
+    assert np.max(np.abs(heat_eqn.b)) < 1e-3
+    # Only powers of two of the initial step are cached, never the clipped last step
+    ratios = np.log2(np.array(sorted(heat_eqn._operators)) / 1e-3)
+    np.testing.assert_allclose(ratios, np.round(ratios))
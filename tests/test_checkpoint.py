@@ -0,0 +1,47 @@
+import numpy as np
+
+from Heat.Checkpoint import load_checkpoint, save_checkpoint
+from Heat.Heat_Equation import HeatEqn2D
+
+
+def make_solver(t):
+    T_i = np.zeros((17, 13))
+    T_i[0, :] = 100.0
+    return HeatEqn2D(1.0, 1.0, 1.0, T_i.shape, 1e-3, t, [1.0, 1.0], T_i)
+
+
+def test_resume_matches_uninterrupted_run(tmp_path):
+    path = str(tmp_path / "run.npz")
+    expected = make_solver(0.02).solve(headless=True)
+
+    def checkpoint(solver):
+        if solver.steps == 8:
+            save_checkpoint(solver, path, operators=True)
+
+    make_solver(0.02).solve(headless=True, callback=checkpoint)
+    resumed = load_checkpoint(path)
+    assert resumed.steps == 8
+    assert resumed.A is not None
+
+    np.testing.assert_allclose(resumed.solve(headless=True), expected, atol=1e-12)
+
+
+def test_resume_mid_adaptive_checkpoint(tmp_path):
+    path = str(tmp_path / "adaptive.npz")
+    saved = {}
+
+    def checkpoint(solver):
+        if solver.TIME_STEP != solver.PARAMS["dt"] and not saved:
+            save_checkpoint(solver, path, operators=True)
+            saved["dt"] = solver.TIME_STEP
+
+    make_solver(0.05).solve_adaptive(tol=1e-2, headless=True, callback=checkpoint)
+    assert saved
+
+    resumed = load_checkpoint(path)
+    # The stored matrices belong to the adaptive step and are not reused for dt
+    assert resumed.A is None
+
+    T = resumed.solve_adaptive(tol=1e-2, headless=True)
+    reference = make_solver(0.05).solve_adaptive(tol=1e-2, headless=True)
+    np.testing.assert_allclose(T, reference, atol=1e-2 * np.max(reference))
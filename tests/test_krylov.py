@@ -0,0 +1,145 @@
+import numpy as np
+import pytest
+from scipy.sparse import diags
+from scipy.sparse.linalg import spsolve
+
+from FVM.MeshStructure.fv_mesh import FVMesh
+from FVM.Solver import krylov
+from FVM.Solver.laplacian import diffusion_operator
+from Heat import Operator_Assembly as oa
+from Heat.Heat_Equation import HeatEqn2D, HeatEqn3D
+
+
+@pytest.fixture
+def spd_system(mesh_factory):
+    """Implicit diffusion matrix V / dt + K of a skewed mesh and a right hand side."""
+    mesh = FVMesh(mesh_factory(40, 30, jitter=0.2))
+    K = diffusion_operator(mesh, mesh.boundary_faces[:10]).matrix()
+    A = (diags(mesh.volumes / 1e-3) + K).tocsr()
+    b = np.random.default_rng(0).random(mesh.n_cells)
+    return A, b
+
+
+@pytest.mark.parametrize("preconditioner", krylov.PRECONDITIONERS)
+@pytest.mark.parametrize("method", krylov.METHODS)
+def test_matches_direct_solve(spd_system, method, preconditioner):
+    A, b = spd_system
+    solver = krylov.KrylovSolver(A, method, preconditioner, tol=1e-10, maxiter=2000)
+    x = solver.solve(b)
+
+    np.testing.assert_allclose(x, spsolve(A.tocsc(), b), rtol=1e-7)
+    assert solver.residual <= 1e-10
+
+
+@pytest.mark.parametrize("method", ["bicgstab", "gmres"])
+def test_nonsymmetric(spd_system, method):
+    A, b = spd_system
+    n = A.shape[0]
+    # Add a skew-symmetric (advection like) part
+    A = (A + diags([np.full(n - 1, 50.0), np.full(n - 1, -50.0)], [1, -1])).tocsr()
+    x = krylov.KrylovSolver(A, method, "ilu", tol=1e-10).solve(b)
+
+    np.testing.assert_allclose(x, spsolve(A.tocsc(), b), rtol=1e-7)
+
+
+def test_amg_hierarchy_reduces_iterations(mesh_factory):
+    mesh = FVMesh(mesh_factory(60, 60))
+    A = diffusion_operator(mesh, mesh.boundary_faces).matrix()
+    b = np.ones(mesh.n_cells)
+    amg = krylov.SmoothedAggregation(A)
+    assert len(amg.sizes) > 1 and amg.sizes[-1] <= 500
+
+    plain = krylov.KrylovSolver(A, "cg", None, tol=1e-8)
+    plain.solve(b)
+    preconditioned = krylov.KrylovSolver(A, "cg", "amg", tol=1e-8)
+    x = preconditioned.solve(b)
+
+    assert preconditioned.iterations < plain.iterations / 3
+    np.testing.assert_allclose(x, spsolve(A.tocsc(), b), rtol=1e-6)
+
+
+def heat_matrix_3d(n, dt):
+    """Crank-Nicolson matrix of the interior points of an n^3 grid on the unit cube."""
+    shape = (n,) * 3
+    interior = np.flatnonzero(oa.interior_mask(shape))
+    A, _ = oa.crank_nicolson(shape, [1.0 / (n - 1)] * 3, 1.0, dt)
+    return A.tocsr()[interior][:, interior].tocsr()
+
+
+def test_aggregation_leaves_out_isolated_nodes():
+    A = heat_matrix_3d(12, 1e-2).tolil()
+    # Decouple the first node from its neighbours
+    A[0, 1:] = 0.0
+    A[1:, 0] = 0.0
+    S = krylov.strength_graph(A.tocsr())
+    agg, n_agg = krylov.aggregate(S)
+
+    assert agg[0] == -1
+    assert np.all(agg[1:] >= 0)
+    assert np.array_equal(np.unique(agg[1:]), np.arange(n_agg))
+    # Every aggregate is connected to its root by at most two strong connections
+    assert np.bincount(agg[1:]).max() <= 1 + 6 + 18
+
+
+@pytest.mark.parametrize("dt", [1e-2, 1e-3, 1e-5])
+def test_amg_hierarchy_of_3d_heat_matrix(dt):
+    A = heat_matrix_3d(24, dt)
+    amg = krylov.SmoothedAggregation(A)
+    sizes = amg.sizes
+    assert all(coarse <= 0.5 * fine for fine, coarse in zip(sizes, sizes[1:]))
+    operator_complexity = sum(level["A"].nnz for level in amg.levels) / A.nnz
+    assert operator_complexity < 2.0
+
+    b = np.random.default_rng(0).random(A.shape[0])
+    solver = krylov.KrylovSolver(A, "cg", "amg", tol=1e-10)
+    np.testing.assert_allclose(solver.solve(b), spsolve(A.tocsc(), b), rtol=1e-7)
+    assert solver.iterations < 40
+
+
+def test_heat_3d_defaults_to_amg():
+    T_i = np.zeros((13, 11, 9))
+    T_i[0] = 100.0
+    direct = HeatEqn3D(1.0, 1.0, 1.0, T_i.shape, 1e-3, 0.01, [1.0, 1.0, 1.0], T_i.copy(),
+                       solver="factorized").solve(headless=True)
+    heat_eqn = HeatEqn3D(1.0, 1.0, 1.0, T_i.shape, 1e-3, 0.01, [1.0, 1.0, 1.0], T_i.copy(), tol=1e-12)
+
+    assert heat_eqn.PRECONDITIONER == "amg"
+    np.testing.assert_allclose(heat_eqn.solve(headless=True), direct, atol=1e-8)
+
+
+def test_preconditioner_is_cached_and_solves_warm_start(spd_system):
+    A, b = spd_system
+    solver = krylov.KrylovSolver(A, "cg", "ilu", tol=1e-10)
+    x = solver.solve(b)
+    # Warm started from the previous solution
+    np.testing.assert_array_equal(solver.solve(b), x)
+    assert solver.iterations == 0
+
+    solver.set_matrix(A.copy())
+    assert solver.setups == 1
+    solver.set_matrix(2.0 * A)
+    assert solver.setups == 2
+    solver.set_matrix(3.0 * A, rebuild=False)
+    assert solver.setups == 2
+    assert solver.report()["solves"] == 2
+
+
+def test_not_converged_raises(spd_system):
+    A, b = spd_system
+    with pytest.raises(RuntimeError):
+        krylov.KrylovSolver(A, "cg", None, tol=1e-12, maxiter=2).solve(b)
+    with pytest.raises(ValueError):
+        krylov.KrylovSolver(A, "minres")
+    with pytest.raises(ValueError):
+        krylov.KrylovSolver(A, "cg", "ssor")
+
+
+@pytest.mark.parametrize("solver, preconditioner", [("cg", "amg"), ("cg", "multigrid"), ("gmres", "ilu")])
+def test_heat_krylov_matches_factorized(solver, preconditioner):
+    T_i = np.zeros((33, 25))
+    T_i[0, :] = 100.0
+    direct = HeatEqn2D(1.0, 1.0, 1.0, T_i.shape, 1e-3, 0.02, [1.0, 1.0], T_i.copy()).solve(headless=True)
+    heat_eqn = HeatEqn2D(1.0, 1.0, 1.0, T_i.shape, 1e-3, 0.02, [1.0, 1.0], T_i.copy(), solver=solver,
+                         preconditioner=preconditioner, tol=1e-12)
+
+    np.testing.assert_allclose(heat_eqn.solve(headless=True), direct, atol=1e-8)
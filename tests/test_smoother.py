@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from scipy.sparse import diags
+from scipy.sparse.linalg import spsolve
+
+from Heat import Operator_Assembly as oa
+from Heat.Heat_Equation import HeatEqn2D
+from Heat.Multigrid import MultigridSolver
+from Heat.Smoother import BlockSmoother
+
+SHAPE = (67, 41)
+SPACING = [1.0 / 66, 1.0 / 40]
+
+
+def poisson_matrix(shape, spacing):
+    """-L on the interior points, identity rows on the boundary."""
+    interior = oa.interior_mask(shape).ravel()
+    return (diags(np.where(interior, 0.0, 1.0)) - diags(interior * 1.0) @ oa.laplacian(shape, spacing)).tocsc()
+
+
+@pytest.fixture
+def fields():
+    rng = np.random.default_rng(0)
+    return rng.random(SHAPE), rng.random(SHAPE)
+
+
+@pytest.mark.parametrize("workers, blocks", [(1, None), (4, None), (3, 7), (2, 16)])
+def test_red_black_matches_serial_multigrid_smoother(fields, workers, blocks):
+    u_0, f = fields
+    multigrid = MultigridSolver(SHAPE, SPACING, 0.01)
+    expected = multigrid.smooth(multigrid.levels[0], u_0.copy(), f, 3, reverse=True)
+
+    smoother = BlockSmoother(SHAPE, SPACING, 0.01, workers=workers, blocks=blocks, min_rows=2)
+    np.testing.assert_allclose(smoother.sweep(u_0.copy(), f, 3, reverse=True), expected, rtol=1e-14)
+
+
+def test_jacobi_does_not_depend_on_the_blocks(fields):
+    u_0, f = fields
+    results = [BlockSmoother(SHAPE, SPACING, 0.01, method="jacobi", omega=0.8, workers=workers,
+                             blocks=blocks, min_rows=2).sweep(u_0.copy(), f, 5)
+               for workers, blocks in [(1, 1), (4, 9)]]
+    np.testing.assert_array_equal(*results)
+
+
+@pytest.mark.parametrize("shape", [(41, 33), (17, 13, 11)])
+def test_steady_state_matches_direct_solve(shape):
+    spacing = [1.0 / (n - 1) for n in shape]
+    f = np.random.default_rng(1).random(shape)
+    smoother = BlockSmoother(shape, spacing, 1.0, shift=0.0, omega="optimal", workers=2, min_rows=4, tol=1e-10)
+    u = smoother.solve(f)
+
+    np.testing.assert_allclose(u.ravel(), spsolve(poisson_matrix(shape, spacing), f.ravel()), atol=1e-9)
+    assert smoother.OMEGA > 1.0
+
+
+def test_multigrid_with_workers_matches_serial(fields):
+    _, f = fields
+    serial = MultigridSolver(SHAPE, SPACING, 0.01, tol=1e-10)
+    threaded = MultigridSolver(SHAPE, SPACING, 0.01, tol=1e-10, workers=3)
+    assert threaded.levels[0].SMOOTHER is not None
+
+    np.testing.assert_allclose(threaded.solve(f), serial.solve(f), rtol=1e-13)
+    assert threaded.iterations == serial.iterations
+
+
+@pytest.mark.parametrize("shape", [(200, 50), (50, 200), (40, 10, 10)])
+@pytest.mark.parametrize("cycle", MultigridSolver.CYCLES)
+def test_multigrid_on_anisotropic_grid(shape, cycle):
+    # Unit square or cube, the spacing differs by a factor of four between the axes
+    spacing = [1.0 / (n - 1) for n in shape]
+    f = np.random.default_rng(2).random(shape)
+    multigrid = MultigridSolver(shape, spacing, 1.0, shift=0.0, tol=1e-10, cycle=cycle)
+    u = multigrid.solve(f)
+
+    np.testing.assert_allclose(u.ravel(), spsolve(poisson_matrix(shape, spacing), f.ravel()), atol=1e-9)
+    assert multigrid.iterations <= 15
+    # Semicoarsening halves the finely spaced axes until the spacings match
+    assert multigrid.levels[1].SHAPE == tuple((n + 1) // 2 if n == max(shape) else n for n in shape)
+
+
+def test_heat_relaxation_solver_and_steady_state():
+    T_i = np.zeros((33, 25))
+    T_i[0, :] = 100.0
+    direct = HeatEqn2D(1.0, 1.0, 1.0, T_i.shape, 1e-3, 0.02, [1.0, 1.0], T_i.copy()).solve(headless=True)
+    heat_eqn = HeatEqn2D(1.0, 1.0, 1.0, T_i.shape, 1e-3, 0.02, [1.0, 1.0], T_i.copy(), solver="relaxation",
+                         workers=2, tol=1e-12)
+    np.testing.assert_allclose(heat_eqn.solve(headless=True), direct, atol=1e-8)
+
+    # Steady state of the initial boundary values
+    steady = heat_eqn.solve_steady(tol=1e-10)
+    f = np.where(oa.interior_mask(T_i.shape), 0.0, T_i)
+    expected = spsolve(poisson_matrix(T_i.shape, heat_eqn.SPACING), f.ravel())
+    np.testing.assert_allclose(steady.ravel(), expected, atol=1e-7)
+    assert heat_eqn.steady
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        BlockSmoother(SHAPE, SPACING, 1.0, method="sor")
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from FVM.MeshStructure.fv_mesh import FVMesh
+from Heat.Checkpoint import load_checkpoint, save_checkpoint
+from Heat.Unstructured import HeatEqnFVM
+
+
+def side_groups(mesh):
+    """Boundary faces on the left and right side of the unit square."""
+    faces = mesh.boundary_faces
+    x = mesh.face_midpoints[faces, 0]
+    return {"left": faces[np.isclose(x, 0.0)], "right": faces[np.isclose(x, 1.0)]}
+
+
+def test_insulated_conserves_energy(mesh_factory):
+    mesh = FVMesh(mesh_factory(6, 5))
+    T_i = np.random.default_rng(1).random(mesh.n_cells)
+    heat_eqn = HeatEqnFVM(1.0, 1.0, 1.0, mesh, 1e-2, 0.1, T_i)
+    T = heat_eqn.solve(headless=True)
+
+    assert np.isclose(mesh.volumes @ T, mesh.volumes @ T_i)
+    assert np.ptp(T) < np.ptp(T_i)
+
+
+def test_neumann_only_adds_the_boundary_flux(mesh_factory):
+    mesh = FVMesh(mesh_factory(6, 5, jitter=0.2))
+    rho, c_p, q = 2.0, 3.0, 5.0
+    heat_eqn = HeatEqnFVM(1.0, rho, c_p, mesh, 1e-2, 0.1, 0.0, boundaries={"left": ("neumann", q)},
+                          groups=side_groups(mesh))
+    T = heat_eqn.solve(headless=True)
+
+    # q per unit length over the unit left side
+    assert np.isclose(mesh.volumes @ T, q * heat_eqn.time / (rho * c_p))
+
+
+@pytest.mark.parametrize("scheme", ["crank-nicolson", "backward-euler"])
+def test_steady_state_is_linear_on_a_skewed_mesh(mesh_factory, scheme):
+    mesh = FVMesh(mesh_factory(8, 8, jitter=0.25))
+    boundaries = {"left": ("dirichlet", 0.0), "right": ("dirichlet", 1.0)}
+    heat_eqn = HeatEqnFVM(1.0, 1.0, 1.0, mesh, 1e-2, 2.0, 0.5, boundaries=boundaries,
+                          groups=side_groups(mesh), scheme=scheme, corrections=3)
+    T = heat_eqn.solve(headless=True)
+
+    # The corrected operator is exact for linear fields
+    np.testing.assert_allclose(T, mesh.centroids[:, 0], atol=1e-6)
+
+
+@pytest.mark.parametrize("solver", ["cg", "bicgstab", "gmres"])
+def test_krylov_matches_factorized(mesh_factory, solver):
+    mesh = FVMesh(mesh_factory(10, 8, jitter=0.2))
+    options = {"boundaries": {"left": ("dirichlet", 100.0), "right": ("neumann", -20.0)},
+               "groups": side_groups(mesh)}
+    direct = HeatEqnFVM(1.0, 1.0, 1.0, mesh, 1e-2, 0.1, 0.0, **options).solve(headless=True)
+    krylov = HeatEqnFVM(1.0, 1.0, 1.0, mesh, 1e-2, 0.1, 0.0, solver=solver, tol=1e-12,
+                        **options).solve(headless=True)
+
+    np.testing.assert_allclose(krylov, direct, atol=1e-8)
+
+
+def test_checkpoint_resumes(mesh_factory, tmp_path):
+    mesh = FVMesh(mesh_factory(6, 5, jitter=0.2))
+    k = np.linspace(1.0, 2.0, mesh.n_cells)
+    boundaries = {"left": ("dirichlet", np.linspace(0.0, 1.0, 5)), "right": ("neumann", 3.0)}
+    heat_eqn = HeatEqnFVM(k, 1.0, 1.0, mesh, 1e-2, 0.1, 0.0, boundaries=boundaries, groups=side_groups(mesh))
+    path = str(tmp_path / "fvm.npz")
+    saved = {}
+
+    def checkpoint(solver):
+        if solver.steps == 4:
+            save_checkpoint(solver, path, operators=True)
+            saved["field"] = solver.b.copy()
+
+    T = heat_eqn.solve(headless=True, callback=checkpoint)
+    resumed = load_checkpoint(path)
+
+    np.testing.assert_array_equal(resumed.b, saved["field"])
+    assert resumed.steps == 4
+    np.testing.assert_allclose(resumed.solve(headless=True), T, atol=1e-12)
+    assert resumed.steps == heat_eqn.steps